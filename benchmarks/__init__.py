@@ -0,0 +1 @@
+"""Offline benchmark suite: python -m benchmarks.run"""
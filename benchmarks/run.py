@@ -0,0 +1,325 @@
+"""
+benchmarks/run.py
+
+Offline benchmarks for the pipeline's hot paths, each timed in
+isolation on a synthetic corpus (benchmarks/synthetic.py):
+
+  chunk_text     summarizer._chunk_text over article bodies
+  extractive     summarizer.summarize(mode="extractive") over article bodies
+  keywords       keywords.count_keywords over titles
+  classify       dataPrep.classify_article (FinBERT stand-in)
+  dedup          dedup.deduplicate
+  tag            tagger.tag_records
+  embed          embedding article bodies
+  faiss_build    FAISS store from precomputed vectors
+  faiss_search   FAISS top-k by query vector
+  bm25_build     lexical.BM25Index from scratch
+  bm25_search    BM25 top-k
+  retrieve       rag.retrieve (hybrid BM25 + FAISS, the retrieval half of answer_query)
+  prompt         rag._build_prompt
+
+Models are replaced by benchmarks/standins.py unless --real-models is
+given. Setup (corpus, fixtures) is excluded; each benchmark's timed body
+runs --repeat times and the median is reported.
+
+Results are printed and written as JSON (--output). With --compare, any
+benchmark slower than the baseline by more than --threshold fails the
+run (exit 1), so two commits can be compared directly:
+
+  git checkout main  && python -m benchmarks.run --output base.json
+  git checkout topic && python -m benchmarks.run --compare base.json
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from benchmarks.synthetic import generate, load_companies
+
+# ────────────────────────────────────────────────────────────
+# CONFIGURATION
+# ────────────────────────────────────────────────────────────
+
+DEFAULT_ARTICLES  = 2000
+DEFAULT_QUERIES   = 200
+DEFAULT_REPEAT    = 3
+DEFAULT_THRESHOLD = 0.20     # 20% slower than baseline counts as a regression
+SEARCH_K          = 20       # candidates per retriever, as rag.FUSION_CANDIDATES
+SYMBOLS_FILE      = Path(__file__).resolve().parent.parent / "symbols.csv"
+
+_QUERY_TEMPLATES = [
+    "{sym}",
+    "{name}",
+    "What did {name} report for the quarter?",
+    "Why are {name} shares moving today?",
+    "{name} earnings guidance and analyst reaction",
+    "Which analysts upgraded or downgraded {sym}?",
+]
+
+# ────────────────────────────────────────────────────────────
+# FIXTURES (built once, outside the timed sections)
+# ────────────────────────────────────────────────────────────
+
+class Fixtures:
+    def __init__(self, n_articles: int, n_queries: int, seed: int, real_models: bool):
+        self.n_articles  = n_articles
+        self.n_queries   = n_queries
+        self.seed        = seed
+        self.real_models = real_models
+
+    @cached_property
+    def records(self) -> List[Dict[str, Any]]:
+        return generate(self.n_articles, seed=self.seed)
+
+    @cached_property
+    def queries(self) -> List[str]:
+        companies = load_companies()
+        return [_QUERY_TEMPLATES[i % len(_QUERY_TEMPLATES)].format(
+                    sym=companies[i % len(companies)][0], name=companies[i % len(companies)][1])
+                for i in range(self.n_queries)]
+
+    @cached_property
+    def embedder(self):
+        if self.real_models:
+            from langchain_huggingface import HuggingFaceEmbeddings
+            import rag
+            return HuggingFaceEmbeddings(model_name=rag.EMBED_MODEL)
+        from benchmarks.standins import HashingEmbeddings
+        return HashingEmbeddings()
+
+    @cached_property
+    def vectors(self) -> List[List[float]]:
+        return self.embedder.embed_documents([r["content_full"] for r in self.records])
+
+    @cached_property
+    def query_vectors(self) -> List[List[float]]:
+        return self.embedder.embed_documents(self.queries)
+
+    @cached_property
+    def vector_db(self):
+        return build_faiss(self.records, self.vectors, self.embedder)
+
+    @cached_property
+    def bm25(self):
+        from lexical import BM25Index
+        index = BM25Index()
+        index.add_many((r["id"], r["title"], r["content_full"]) for r in self.records)
+        return index
+
+def build_faiss(records: List[Dict[str, Any]], vectors: List[List[float]], embedder):
+    from langchain_community.vectorstores import FAISS
+    metadatas = [{k: r.get(k) for k in ("id", "title", "url", "timestamp", "ticker")}
+                 for r in records]
+    return FAISS.from_embeddings(
+        [(r["content_full"], v) for r, v in zip(records, vectors)], embedder, metadatas=metadatas)
+
+# ────────────────────────────────────────────────────────────
+# BENCHMARKS
+# Each returns (timed callable, number of items it processes).
+# ────────────────────────────────────────────────────────────
+
+Bench = Tuple[Callable[[], Any], int]
+
+def bench_chunk_text(fx: Fixtures) -> Bench:
+    import summarizer
+    if not fx.real_models:
+        from benchmarks.standins import StandInTokenizer
+        summarizer.tokenizer = StandInTokenizer()
+    bodies = [r["content_full"] for r in fx.records]
+    return (lambda: [summarizer._chunk_text(b) for b in bodies]), len(bodies)
+
+def bench_extractive(fx: Fixtures) -> Bench:
+    import summarizer
+    bodies = [r["content_full"] for r in fx.records]
+    return (lambda: [summarizer.summarize(b, mode="extractive") for b in bodies]), len(bodies)
+
+def bench_keywords(fx: Fixtures) -> Bench:
+    from keywords import count_keywords
+    titles = [r["title"] for r in fx.records]
+    return (lambda: [count_keywords(t) for t in titles]), len(titles)
+
+def bench_classify(fx: Fixtures) -> Bench:
+    import dataPrep
+    if not fx.real_models:
+        from benchmarks.standins import StandInSentiment
+        dataPrep.sentiment_pipeline = StandInSentiment()
+    records = fx.records
+    return (lambda: [dataPrep.classify_article(r) for r in records]), len(records)
+
+def bench_dedup(fx: Fixtures) -> Bench:
+    from dedup import deduplicate
+    records = fx.records
+    # deduplicate annotates the canonical records, so hand it fresh copies
+    return (lambda: deduplicate([dict(r) for r in records])), len(records)
+
+def bench_tag(fx: Fixtures) -> Bench:
+    from tagger import SymbolTagger, tag_records
+    tagger  = SymbolTagger.from_csv(str(SYMBOLS_FILE))
+    records = fx.records
+    return (lambda: tag_records([dict(r) for r in records], tagger)), len(records)
+
+def bench_embed(fx: Fixtures) -> Bench:
+    bodies = [r["content_full"] for r in fx.records]
+    return (lambda: fx.embedder.embed_documents(bodies)), len(bodies)
+
+def bench_faiss_build(fx: Fixtures) -> Bench:
+    records, vectors = fx.records, fx.vectors
+    return (lambda: build_faiss(records, vectors, fx.embedder)), len(records)
+
+def bench_faiss_search(fx: Fixtures) -> Bench:
+    db, qvs = fx.vector_db, fx.query_vectors
+    return (lambda: [db.similarity_search_by_vector(v, k=SEARCH_K) for v in qvs]), len(qvs)
+
+def bench_bm25_build(fx: Fixtures) -> Bench:
+    from lexical import BM25Index
+    records = fx.records
+    def build():
+        index = BM25Index()
+        index.add_many((r["id"], r["title"], r["content_full"]) for r in records)
+        return index
+    return build, len(records)
+
+def bench_bm25_search(fx: Fixtures) -> Bench:
+    index, queries = fx.bm25, fx.queries
+    return (lambda: [index.search(q, SEARCH_K) for q in queries]), len(queries)
+
+def bench_retrieve(fx: Fixtures) -> Bench:
+    import rag
+    rag.use_store(fx.embedder, fx.vector_db, fx.bm25)
+    queries = fx.queries
+    return (lambda: [rag.retrieve(q) for q in queries]), len(queries)
+
+def bench_prompt(fx: Fixtures) -> Bench:
+    import rag
+    rag.use_store(fx.embedder, fx.vector_db, fx.bm25)
+    pairs = list(zip(fx.queries, rag.retrieve_batch(fx.queries)))
+    return (lambda: [rag._build_prompt(q, docs) for q, docs in pairs]), len(pairs)
+
+BENCHMARKS: Dict[str, Callable[[Fixtures], Bench]] = {
+    "chunk_text":   bench_chunk_text,
+    "extractive":   bench_extractive,
+    "keywords":     bench_keywords,
+    "classify":     bench_classify,
+    "dedup":        bench_dedup,
+    "tag":          bench_tag,
+    "embed":        bench_embed,
+    "faiss_build":  bench_faiss_build,
+    "faiss_search": bench_faiss_search,
+    "bm25_build":   bench_bm25_build,
+    "bm25_search":  bench_bm25_search,
+    "retrieve":     bench_retrieve,
+    "prompt":       bench_prompt,
+}
+
+# ────────────────────────────────────────────────────────────
+# RUNNER
+# ────────────────────────────────────────────────────────────
+
+def time_bench(fn: Callable[[], Any], items: int, repeat: int) -> Dict[str, float]:
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - started)
+    median = statistics.median(runs)
+    return {
+        "seconds":       median,
+        "min_seconds":   min(runs),
+        "items":         items,
+        "ms_per_item":   1000 * median / items if items else 0.0,
+        "items_per_sec": items / median if median else 0.0,
+    }
+
+def git_sha() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def run(names: List[str], fx: Fixtures, repeat: int) -> Dict[str, Any]:
+    results = {}
+    for name in names:
+        fn, items = BENCHMARKS[name](fx)
+        fn()                                   # warm caches / lazy imports untimed
+        results[name] = time_bench(fn, items, repeat)
+        print(f"  {name:<13} {results[name]['seconds'] * 1000:10.1f} ms "
+              f"{results[name]['ms_per_item']:10.3f} ms/item", flush=True)
+    return {
+        "meta": {
+            "git_sha":     git_sha(),
+            "timestamp":   datetime.now(timezone.utc).isoformat(),
+            "python":      platform.python_version(),
+            "platform":    platform.platform(),
+            "articles":    fx.n_articles,
+            "queries":     fx.n_queries,
+            "seed":        fx.seed,
+            "repeat":      repeat,
+            "real_models": fx.real_models,
+        },
+        "results": results,
+    }
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Print a side-by-side table; return the benchmarks that regressed."""
+    regressions = []
+    print(f"\nvs {baseline['meta'].get('git_sha', '?')[:10]} (threshold +{threshold:.0%})")
+    for name, res in current["results"].items():
+        base = baseline["results"].get(name)
+        if not base or not base["seconds"]:
+            print(f"  {name:<13} (no baseline)")
+            continue
+        ratio = res["seconds"] / base["seconds"]
+        flag  = "REGRESSION" if ratio > 1 + threshold else ""
+        print(f"  {name:<13} {base['seconds'] * 1000:10.1f} -> {res['seconds'] * 1000:10.1f} ms "
+              f"({ratio - 1:+.1%}) {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+def main(args):
+    names = args.only or list(BENCHMARKS)
+    fx    = Fixtures(args.articles, args.queries, args.seed, args.real_models)
+    print(f"Benchmarking {len(names)} hot path(s) on {args.articles} synthetic articles "
+          f"({'real' if args.real_models else 'stand-in'} models)")
+    report = run(names, fx, args.repeat)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote results to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("articles") != args.articles:
+            print(f"warning: baseline used {baseline['meta'].get('articles')} articles, this run {args.articles}")
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"Regressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark MarketDigest hot paths offline")
+    parser.add_argument("--only", action="append", choices=list(BENCHMARKS), metavar="NAME",
+                        help=f"Run only NAME (repeatable): {', '.join(BENCHMARKS)}")
+    parser.add_argument("--articles", type=int, default=DEFAULT_ARTICLES, help="Synthetic corpus size")
+    parser.add_argument("--queries", type=int, default=DEFAULT_QUERIES, help="Queries for search benchmarks")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus seed")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Timed runs per benchmark (median reported)")
+    parser.add_argument("--real-models", action="store_true",
+                        help="Use the real FinBERT/BART tokenizer/MiniLM instead of stand-ins")
+    parser.add_argument("--output", help="Write JSON results here")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown vs baseline before failing (0.2 = 20%%)")
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,68 @@
+"""
+benchmarks/standins.py
+
+Tiny local stand-ins for the pipeline's models, so the benchmarks run
+offline in seconds. Each one mirrors the interface it replaces:
+
+  StandInTokenizer   .tokenize(text) like a Hugging Face tokenizer (BART)
+  StandInSentiment   callable returning [{"label", "score"}] like the FinBERT pipeline
+  HashingEmbeddings  LangChain Embeddings (MiniLM) backed by feature hashing
+
+They do a similar amount of Python-side work per call as the real
+wrappers. Timings measure our code around the model, not model quality.
+"""
+
+import hashlib
+import re
+from typing import Dict, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+EMBED_DIM = 384            # same width as all-MiniLM-L6-v2
+
+_WORDPIECE_RE = re.compile(r"\w+|[^\w\s]")
+_POS_CUES = ("beat", "rise", "gain", "upgrade", "record", "raise", "strong", "outperform")
+_NEG_CUES = ("miss", "fall", "cut", "downgrade", "warn", "recall", "weak", "underperform")
+
+class StandInTokenizer:
+    """Word/punctuation split with long words broken into 4-char pieces, roughly BPE-sized."""
+    def tokenize(self, text: str) -> List[str]:
+        pieces = []
+        for tok in _WORDPIECE_RE.findall(text or ""):
+            pieces.extend(tok[i:i + 4] for i in range(0, len(tok), 4))
+        return pieces
+
+class StandInSentiment:
+    """Keyword-cue classifier with FinBERT's output shape and labels."""
+    def __call__(self, text: str) -> List[Dict[str, float]]:
+        low = text.lower()
+        pos = sum(low.count(c) for c in _POS_CUES)
+        neg = sum(low.count(c) for c in _NEG_CUES)
+        if pos == neg:
+            return [{"label": "neutral", "score": 0.5}]
+        label = "positive" if pos > neg else "negative"
+        return [{"label": label, "score": max(pos, neg) / (pos + neg)}]
+
+class HashingEmbeddings(Embeddings):
+    """
+    Bag-of-words feature hashing into EMBED_DIM dims, L2-normalized.
+    Similar texts land close together, which is enough for FAISS/RAG
+    timings to exercise realistic neighbour lists.
+    """
+    def __init__(self, dim: int = EMBED_DIM):
+        self.dim = dim
+
+    def _embed(self, text: str) -> List[float]:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for word in re.findall(r"[a-z0-9]+", text.lower()):
+            h = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+            vec[h % self.dim] += 1.0 if (h >> 63) else -1.0
+        norm = np.linalg.norm(vec)
+        return (vec / norm if norm else vec).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
@@ -0,0 +1,150 @@
+"""
+benchmarks/synthetic.py
+
+Generate realistic-looking Yahoo Finance articles in the scraper's JSONL
+schema (id, title, url, ticker, timestamp, summary, content_full,
+pos_count, neg_count) without touching the network.
+
+Articles are built from finance headline/body templates over the
+companies in symbols.csv. A configurable share are syndicated copies
+with light edits, so dedup and tagging see realistic input.
+
+Usage:
+  python -m benchmarks.synthetic --articles 5000 --output synthetic.jsonl
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from keywords import count_keywords
+
+SYMBOLS_FILE = Path(__file__).resolve().parent.parent / "symbols.csv"
+
+_FALLBACK_COMPANIES = [("AAPL", "Apple"), ("MSFT", "Microsoft"), ("NVDA", "Nvidia"),
+                       ("TSLA", "Tesla"), ("AMZN", "Amazon"), ("JPM", "JPMorgan")]
+
+_HEADLINES_POS = [
+    "{name} ({sym}) beats Q{q} earnings, raises full-year guidance",
+    "Analysts upgrade {name} to outperform on strong demand",
+    "{name} stock hits record high as revenue jumps {pct}%",
+    "{name} ({sym}) shares rise after price target boost",
+]
+_HEADLINES_NEG = [
+    "{name} ({sym}) misses Q{q} estimates, cuts outlook",
+    "{name} downgraded to underperform as margins fall",
+    "{name} warns of weaker sales; shares down {pct}%",
+    "Regulators probe {name} after product recall",
+]
+_HEADLINES_NEU = [
+    "What to watch from {name} ({sym}) this week",
+    "{name} to report Q{q} results on Thursday",
+    "{name} names new chief financial officer",
+]
+_SENTENCES = [
+    "{name} reported revenue of ${rev} billion for the quarter, compared with ${rev2} billion a year ago.",
+    "Shares of {sym} were {dir} {pct}% in premarket trading on {day}.",
+    "Analysts at {bank} said the results {verdict} expectations.",
+    "The company guided to earnings per share of ${eps} for the next quarter.",
+    "{other} and {other2} also moved after the report, as investors rotated within the sector.",
+    "Chief executive officer said demand for its products remained {demand} across regions.",
+    "The S&P 500 was {dir} {small}% while the Nasdaq Composite {dir2} {small2}%.",
+    "Q{q} operating margin came in at {pct}%, {verdict2} the consensus forecast.",
+    "Options traders priced in a {pct}% move following the announcement.",
+    "{name} has gained {pct}% so far this year, outpacing the broader market.",
+]
+_BANKS  = ["Goldman Sachs", "Morgan Stanley", "JPMorgan", "Bank of America", "Citi", "Wells Fargo"]
+_DAYS   = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+
+def load_companies() -> List[Tuple[str, str]]:
+    if not SYMBOLS_FILE.exists():
+        return _FALLBACK_COMPANIES
+    with open(SYMBOLS_FILE, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    # the first alias is the short name people actually write ("Apple", not "Apple Inc.")
+    return [(r["symbol"], ((r.get("aliases") or "").split("|")[0] or r["name"]).strip())
+            for r in rows] or _FALLBACK_COMPANIES
+
+def _fill(template: str, rnd: random.Random, sym: str, name: str,
+          companies: List[Tuple[str, str]]) -> str:
+    others = rnd.sample(companies, 2)
+    return template.format(
+        sym=sym, name=name, q=rnd.randint(1, 4), pct=rnd.randint(1, 35),
+        rev=round(rnd.uniform(1, 120), 1), rev2=round(rnd.uniform(1, 120), 1),
+        eps=round(rnd.uniform(0.1, 9), 2), bank=rnd.choice(_BANKS), day=rnd.choice(_DAYS),
+        dir=rnd.choice(["up", "down"]), dir2=rnd.choice(["rose", "fell"]),
+        small=round(rnd.uniform(0.1, 2.5), 1), small2=round(rnd.uniform(0.1, 2.5), 1),
+        verdict=rnd.choice(["beat", "missed", "matched"]),
+        verdict2=rnd.choice(["above", "below", "in line with"]),
+        demand=rnd.choice(["strong", "soft", "resilient", "uneven"]),
+        other=others[0][1], other2=others[1][1],
+    )
+
+def _rewrite(text: str, rnd: random.Random) -> str:
+    """A light syndication edit: swap a couple of words, add a wire tag."""
+    words = text.split()
+    for _ in range(max(1, len(words) // 150)):
+        i = rnd.randrange(len(words))
+        words[i] = rnd.choice(["reportedly", "notably", "also", "meanwhile"])
+    return " ".join(words) + rnd.choice([" (Reuters)", " — Bloomberg", " (AP)"])
+
+def generate(n_articles: int, seed: int = 0, dup_rate: float = 0.2,
+             sentences: Tuple[int, int] = (8, 30), hours: int = 24) -> List[Dict[str, Any]]:
+    rnd       = random.Random(seed)
+    companies = load_companies()
+    now       = datetime.now(timezone.utc)
+    out: List[Dict[str, Any]] = []
+
+    while len(out) < n_articles:
+        if out and rnd.random() < dup_rate:
+            src  = rnd.choice(out)
+            url  = f"https://finance.yahoo.com/news/{hashlib.sha1(f'{seed}-{len(out)}'.encode()).hexdigest()[:16]}.html"
+            body = _rewrite(src["content_full"], rnd)
+            title, sym, summary = src["title"], src["ticker"], src["summary"]
+        else:
+            sym, name = rnd.choice(companies)
+            mood  = rnd.random()
+            pool  = _HEADLINES_POS if mood < 0.4 else _HEADLINES_NEG if mood < 0.8 else _HEADLINES_NEU
+            title = _fill(rnd.choice(pool), rnd, sym, name, companies)
+            body  = " ".join(_fill(rnd.choice(_SENTENCES), rnd, sym, name, companies)
+                             for _ in range(rnd.randint(*sentences)))
+            # break into paragraphs like the scraper's "\n\n".join(p.text ...)
+            parts = body.split(". ")
+            body  = "\n\n".join(". ".join(parts[i:i + 3]) for i in range(0, len(parts), 3))
+            summary = body.split("\n\n")[0][:200]
+            slug  = hashlib.sha1(f"{seed}-{len(out)}".encode()).hexdigest()[:16]
+            url   = f"https://finance.yahoo.com/news/{slug}.html"
+
+        pos_count, neg_count = count_keywords(title)
+        ts = now - timedelta(seconds=rnd.randint(0, hours * 3600))
+        out.append({
+            "id":           hashlib.sha1(url.encode("utf-8")).hexdigest(),
+            "title":        title,
+            "url":          url,
+            "ticker":       sym if f"({sym})" in title else None,
+            "timestamp":    ts.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "summary":      summary,
+            "content_full": body,
+            "pos_count":    pos_count,
+            "neg_count":    neg_count,
+        })
+    return out
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic news corpus in the scraper's JSONL schema")
+    parser.add_argument("--articles", type=int, default=1000, help="Number of articles")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--dup-rate", type=float, default=0.2, help="Share of syndicated near-duplicates")
+    parser.add_argument("--output", default="synthetic_news.jsonl", help="Output JSONL path")
+    args = parser.parse_args()
+
+    records = generate(args.articles, seed=args.seed, dup_rate=args.dup_rate)
+    with open(args.output, "w", encoding="utf-8") as f:
+        for rec in records:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    print(f"Wrote {len(records)} synthetic articles to {args.output}")
@@ -1,22 +1,140 @@
 import streamlit as st
 st.set_page_config(page_title="24h Stock News Sentiment", layout="wide")
 
+import json
+import os
+import urllib.error
+import numpy as np
 import pandas as pd
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 # ────────────────────────────────────────────────────────────
-# IMPORT YOUR RAG FUNCTION
+# RAG SERVICE CLIENT
 # ────────────────────────────────────────────────────────────
-from rag import answer_query
+# Models live in rag_service.py (one copy per machine, warmed up at
+# startup); every dashboard session just talks to it over HTTP.
+from rag_client import RAGClient
+from sentiment_store import AGGREGATES_FILE, MARKET_TICKER, STORE_DIR, load_aggregates
+
+@st.cache_resource
+def get_rag_client() -> RAGClient:
+    return RAGClient()
+
+rag_client = get_rag_client()
 
 # ────────────────────────────────────────────────────────────
 # 1) LOAD & CLASSIFY DATA
 # ────────────────────────────────────────────────────────────
-@st.cache_data
-def load_classification(path: str = "sentiment.csv") -> pd.DataFrame:
-    return pd.read_csv(path)
+SENTIMENT_FILE    = "sentiment.csv"
+SUMMARIES_FILE    = "summaries.jsonl"   # written by `python summarizer.py`
+CLASSIFICATIONS   = ["best_to_buy", "best_to_avoid"]
+PAGE_SIZE_OPTIONS = [10, 25, 50, 100]
+
+# never content_full: dataPrep writes a short `preview` so article bodies aren't parsed here
+_LOAD_COLUMNS = {"id", "title", "url", "ticker", "tickers", "timestamp",
+                 "preview", "summary", "classification"}
+
+def _parse_tickers(value: Any) -> List[str]:
+    # dataPrep stores the tagger's ticker list as a JSON string
+    try:
+        parsed = json.loads(value) if isinstance(value, str) else []
+    except ValueError:
+        return []
+    if not isinstance(parsed, list):
+        return []
+    return [t for t in parsed if isinstance(t, str)]
+
+def file_mtime(path: str) -> float:
+    return os.path.getmtime(path) if os.path.exists(path) else 0.0
+
+# cache_resource (not cache_data) so reruns get the same read-only objects
+# back without re-pickling the frames; `mtime` is only part of the cache
+# key, so rewriting the file invalidates everything derived from it.
+@st.cache_resource(max_entries=2, show_spinner="Loading stories…")
+def load_classification(path: str, mtime: float, summaries_mtime: float = 0.0) -> Dict[str, Any]:
+    """
+    Read sentiment.csv once per file version and precompute, per
+    classification: the stories sorted by publish time, their publish
+    times as int64 for binary search, and row positions per ticker.
+    """
+    df = pd.read_csv(path, usecols=lambda c: c in _LOAD_COLUMNS)
+    for col in ("id", "summary", "ticker"):
+        if col not in df:
+            df[col] = ""
+    # CSVs from before dataPrep wrote `preview` fall back to the listing blurb
+    if "preview" not in df:
+        df["preview"] = df["summary"]
+
+    # generated summaries beat dataPrep's preview (listing blurb or start of the text)
+    preview = df["preview"].fillna("").astype(str)
+    if summaries_mtime:
+        generated = pd.read_json(SUMMARIES_FILE, lines=True)
+        if len(generated):
+            by_id     = generated.drop_duplicates("id", keep="last").set_index("id")["summary"]
+            generated = df["id"].map(by_id).fillna("")
+            preview   = generated.where(generated.str.len() > 0, preview)
+    df["preview"] = preview
+    df = df.drop(columns=["summary"])
+
+    df["ticker"]    = df["ticker"].fillna("").astype(str)
+    # every tagged ticker, falling back to the scraper's single title ticker
+    tagged = df["tickers"].map(_parse_tickers) if "tickers" in df else [[]] * len(df)
+    df["tickers"] = [tags or ([single] if single else [])
+                     for tags, single in zip(tagged, df["ticker"])]
+    df["published"] = pd.to_datetime(df["timestamp"], utc=True, errors="coerce")
+    df = df.sort_values("published", na_position="first", kind="stable")
+
+    views = {}
+    for cls in CLASSIFICATIONS:
+        frame = df[df["classification"] == cls].reset_index(drop=True)
+        published = frame["published"].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        # exploded index labels are row positions, so groups give positions per ticker
+        mentions  = frame["tickers"].explode().dropna()
+        views[cls] = {
+            "frame":     frame,
+            "published": published,     # NaT sorts first as int64 min
+            "by_ticker": {t: np.asarray(pos, dtype=np.int64)
+                          for t, pos in mentions.groupby(mentions).groups.items()},
+        }
+
+    dates = df["published"].dropna()
+    return {
+        "views":   views,
+        "tickers": sorted({t for tags in df["tickers"] for t in tags}),
+        "dates":   (dates.min().date(), dates.max().date()) if len(dates) else None,
+    }
+
+@st.cache_resource(max_entries=64)
+def filtered_positions(path: str, mtime: float, cls: str,
+                       tickers: Tuple[str, ...], date_range: Optional[Tuple[Any, Any]]) -> np.ndarray:
+    """
+    Row positions (newest first) in the `cls` view that match the
+    ticker and date filters, found via the precomputed indexes.
+    """
+    view = load_classification(path, mtime, file_mtime(SUMMARIES_FILE))["views"][cls]
+    n    = len(view["frame"])
+
+    lo, hi = 0, n
+    if date_range is not None:
+        start, end = (pd.Timestamp(d, tz="UTC").value for d in date_range)
+        end += pd.Timedelta(days=1).value
+        lo = int(np.searchsorted(view["published"], start, side="left"))
+        hi = int(np.searchsorted(view["published"], end,   side="left"))
+
+    if tickers:
+        by_ticker = view["by_ticker"]
+        positions = np.concatenate([by_ticker.get(t, np.empty(0, dtype=np.int64)) for t in tickers])
+        positions = np.sort(positions)
+        positions = positions[(positions >= lo) & (positions < hi)]
+    else:
+        positions = np.arange(lo, hi)
+    return positions[::-1]
 
-df = load_classification()
+sentiment_mtime = file_mtime(SENTIMENT_FILE)
+if not sentiment_mtime:
+    st.error(f"`{SENTIMENT_FILE}` not found. Run `python dataPrep.py` first.")
+    st.stop()
+data = load_classification(SENTIMENT_FILE, sentiment_mtime, file_mtime(SUMMARIES_FILE))
 
 
 # ────────────────────────────────────────────────────────────
@@ -25,48 +143,129 @@ df = load_classification()
 st.title("24h Stock News Sentiment Dashboard")
 st.markdown("Best to Buy vs Best to Avoid stories from the last 24h")
 
+with st.sidebar:
+    st.header("Filters")
+    tickers = tuple(sorted(st.multiselect("Tickers", data["tickers"])))
+    date_range = None
+    if data["dates"]:
+        picked = st.date_input("Published between", value=data["dates"],
+                               min_value=data["dates"][0], max_value=data["dates"][1])
+        # only filter once a full range is picked and it differs from "everything"
+        if isinstance(picked, (list, tuple)) and len(picked) == 2 and tuple(picked) != data["dates"]:
+            date_range = tuple(picked)
+    page_size = st.selectbox("Stories per page", PAGE_SIZE_OPTIONS, index=1)
+
+def render_stories(cls: str, empty_message: str) -> None:
+    frame     = data["views"][cls]["frame"]
+    positions = filtered_positions(SENTIMENT_FILE, sentiment_mtime, cls, tickers, date_range)
+    if not len(positions):
+        st.write(empty_message)
+        return
+
+    n_pages = (len(positions) - 1) // page_size + 1
+    page = 1
+    if n_pages > 1:
+        page = st.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages,
+                               value=1, step=1, key=f"page_{cls}")
+    shown = positions[(page - 1) * page_size: page * page_size]
+    st.caption(f"{len(positions)} stories")
+
+    # itertuples on just the visible page; the rest of the archive is never touched
+    for row in frame.iloc[shown].itertuples(index=False):
+        with st.expander(row.title):
+            st.markdown(f"[Read on Yahoo ▶]({row.url})")
+            st.write(row.preview)
+
 col1, col2 = st.columns(2)
 
 with col1:
     st.header("🟢 Best to Buy")
-    pos_df = df[df.classification == "best_to_buy"]
-    if pos_df.empty:
-        st.write("No positive stories right now.")
-    else:
-        for _, row in pos_df.iterrows():
-            with st.expander(row.title):
-                st.markdown(f"[Read on Yahoo ▶]({row.url})")
-                text = getattr(row, "summary", None) or getattr(row, "content_full", "")
-                st.write(text)
+    render_stories("best_to_buy", "No positive stories right now.")
 
 with col2:
     st.header("🔴 Best to Avoid")
-    neg_df = df[df.classification == "best_to_avoid"]
-    if neg_df.empty:
-        st.write("No negative stories right now.")
-    else:
-        for _, row in neg_df.iterrows():
-            with st.expander(row.title):
-                st.markdown(f"[Read on Yahoo ▶]({row.url})")
-                text = getattr(row, "summary", None) or getattr(row, "content_full", "")
-                st.write(text)
+    render_stories("best_to_avoid", "No negative stories right now.")
 
 # ────────────────────────────────────────────────────────────
-# 3) FREE-FORM RAG QUESTION
+# 3) PER-TICKER SENTIMENT TREND
+# ────────────────────────────────────────────────────────────
+TREND_DAYS = 30
+
+@st.cache_resource(max_entries=2)
+def load_trends(store_dir: str, mtime: float) -> Dict[str, pd.DataFrame]:
+    """Daily aggregate rows split per ticker once per aggregates-file version."""
+    aggregates = load_aggregates(store_dir)
+    return {t: g.set_index("date").sort_index() for t, g in aggregates.groupby("ticker")}
+
+aggregates_path = os.path.join(STORE_DIR, AGGREGATES_FILE)
+aggregates_mtime = file_mtime(aggregates_path)
+if aggregates_mtime:
+    st.markdown("---")
+    st.header("Sentiment trend")
+    trends = load_trends(STORE_DIR, aggregates_mtime)
+    options = sorted(trends, key=lambda t: (t != MARKET_TICKER, t))
+    default = tickers[0] if len(tickers) == 1 and tickers[0] in trends else MARKET_TICKER
+    picked_ticker = st.selectbox(
+        "Ticker", options, index=options.index(default) if default in options else 0,
+        format_func=lambda t: "All news" if t == MARKET_TICKER else t,
+    )
+    history = trends[picked_ticker].tail(TREND_DAYS)
+
+    trend_col, volume_col = st.columns(2)
+    with trend_col:
+        st.caption("Mean FinBERT score (daily and 7-day)")
+        st.line_chart(history[["mean_score", "mean_score_7d"]])
+    with volume_col:
+        st.caption("Stories per day and 7-day buy share")
+        st.bar_chart(history[["buy", "avoid", "neutral"]])
+        st.line_chart(history[["buy_avoid_ratio_7d"]])
+
+# ────────────────────────────────────────────────────────────
+# 4) FREE-FORM RAG QUESTION
 # ────────────────────────────────────────────────────────────
 st.markdown("---")
 st.header("Ask a question about today’s news")
 
 query: Optional[str] = st.text_input("Enter your question")
 if query:
-    with st.spinner("Retrieving and answering…"):
-        answer, sources = answer_query(query)
+    try:
+        health = rag_client.health()
+    except Exception:
+        st.error(f"RAG service is not reachable at {rag_client.base_url}. "
+                 "Start it with `python rag_service.py`.")
+        st.stop()
+    if not health.get("ready"):
+        st.info("The Q&A model is still warming up; the first answer may take a moment.")
 
     st.subheader("Answer")
-    st.write(answer)
+    answer_box = st.empty()
+    answer_box.markdown("_Retrieving…_")
 
     st.subheader("Source Articles")
-    for meta in sources:
-        title = meta.get("title", "No title")
-        url   = meta.get("url", "#")
-        st.markdown(f"- [{title}]({url})")
+    sources_box = st.container()
+
+    partial = ""
+    try:
+        for kind, payload in rag_client.answer_query_stream(query):
+            if kind == "sources":
+                with sources_box:
+                    for meta in payload:
+                        title = meta.get("title", "No title")
+                        url   = meta.get("url", "#")
+                        st.markdown(f"- [{title}]({url})")
+                answer_box.markdown("_Generating answer…_")
+            elif kind == "token":
+                partial += payload
+                answer_box.markdown(partial + " ▌")
+            elif kind == "answer":
+                answer_box.write(payload)
+    except urllib.error.HTTPError as e:
+        answer_box.empty()
+        if e.code == 503:
+            st.warning("Q&A service busy, retry shortly.")
+        else:
+            st.error(f"Q&A service returned HTTP {e.code}.")
+    except (RuntimeError, OSError) as e:
+        # RuntimeError: the service sent an ["error", ...] event mid-stream
+        answer_box.empty()
+        st.error(f"Could not answer the question: {e}")
@@ -1,43 +1,107 @@
+import argparse
+import json
+from pathlib import Path
 import pandas as pd
 from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
 
-# Load FinBERT sentiment analysis pipeline once
-sentiment_model = AutoModelForSequenceClassification.from_pretrained("ProsusAI/finbert")
-sentiment_tokenizer = AutoTokenizer.from_pretrained("ProsusAI/finbert")
-sentiment_pipeline = pipeline("sentiment-analysis", model=sentiment_model, tokenizer=sentiment_tokenizer)
+from dedup import deduplicate, format_report
+from sentiment_store import append_articles, format_store_report
+from tagger import SYMBOLS_FILE, SymbolTagger, tag_records
+import telemetry
 
+PREVIEW_CHARS = 1200    # the dashboard shows at most this much of an article's text
 
-df = pd.read_json("selenium_yahoo_finance.jsonl", lines=True)
+# Load FinBERT sentiment analysis pipeline once, on first use
+# (benchmarks assign a stand-in here instead)
+sentiment_pipeline = None
 
-def classify_article(row):
+def _get_sentiment_pipeline():
+    global sentiment_pipeline
+    if sentiment_pipeline is None:
+        with telemetry.span("classify.model_load"):
+            sentiment_model = AutoModelForSequenceClassification.from_pretrained("ProsusAI/finbert")
+            sentiment_tokenizer = AutoTokenizer.from_pretrained("ProsusAI/finbert")
+            sentiment_pipeline = pipeline("sentiment-analysis", model=sentiment_model, tokenizer=sentiment_tokenizer)
+    return sentiment_pipeline
+
+
+def score_article(row):
+    """
+    Returns (classification, sentiment_score), where sentiment_score is
+    FinBERT's confidence signed by its label: +score positive, -score
+    negative, 0.0 neutral.
+    """
     # Prefer full content, fallback to summary, then title
     text = row.get("content_full") or row.get("summary") or row.get("title")
     # Limit length for performance if needed
     if not text or len(text.strip()) < 20:
-        return "neutral"
+        return "neutral", 0.0
 
     # Run sentiment model
+    classifier = _get_sentiment_pipeline()
     try:
-        result = sentiment_pipeline(text[:512])[0]  # FinBERT is best with up to 512 tokens
+        with telemetry.span("classify.finbert"):
+            result = classifier(text[:512])[0]  # FinBERT is best with up to 512 tokens
+        telemetry.count("articles_classified")
         label = result["label"].lower()  # 'positive', 'neutral', or 'negative'
         score = result["score"]
+        signed = score if label == "positive" else -score if label == "negative" else 0.0
 
         # Refine with some rule-based logic for “Best to Buy/Avoid”
         text_lower = text.lower()
         if label == "positive" and ("upgrade" in text_lower or "beats" in text_lower or "raises" in text_lower or "price target" in text_lower or "record high" in text_lower or "outperform" in text_lower):
-            return "best_to_buy"
+            return "best_to_buy", signed
         elif label == "negative" and ("downgrade" in text_lower or "warns" in text_lower or "misses" in text_lower or "cuts" in text_lower or "recall" in text_lower or "underperform" in text_lower):
-            return "best_to_avoid"
+            return "best_to_avoid", signed
         elif label == "positive":
-            return "best_to_buy"
+            return "best_to_buy", signed
         elif label == "negative":
-            return "best_to_avoid"
+            return "best_to_avoid", signed
         else:
-            return "neutral"
+            return "neutral", signed
     except Exception as e:
         print("Error classifying article:", e)
-        return "neutral"
+        return "neutral", 0.0
+
+def classify_article(row):
+    return score_article(row)[0]
+
+def main(args):
+    df = pd.read_json(args.input, lines=True)
+
+    # Classify each syndicated story once; copies ride along in `duplicates`
+    with telemetry.span("classify.dedup", articles=len(df)):
+        records, dedup_report = deduplicate(df.to_dict("records"))
+    print(format_report(dedup_report))
+    if Path(SYMBOLS_FILE).exists():
+        with telemetry.span("classify.tag", articles=len(records)):
+            records = tag_records(records, SymbolTagger.from_csv(SYMBOLS_FILE))
+    df = pd.DataFrame(records)
+
+    with telemetry.span("classify.score", articles=len(df)):
+        scored = df.apply(score_article, axis=1)
+    df["classification"]  = [label for label, _ in scored]
+    df["sentiment_score"] = [score for _, score in scored]
+
+    # Append this run to the history store and roll the per-ticker daily aggregates forward
+    with telemetry.span("classify.store"):
+        print(format_store_report(append_articles(df.to_dict("records"))))
+
+    # a short preview so the dashboard never has to load content_full
+    blank   = pd.Series("", index=df.index)
+    summary = df.get("summary", blank).fillna("").astype(str)
+    body    = df.get("content_full", blank).fillna("").astype(str)
+    df["preview"] = summary.where(summary.str.len() > 0, body.str.slice(0, PREVIEW_CHARS))
+
+    for col in ("duplicates", "tickers", "ticker_mentions"):
+        if col in df:
+            df[col] = df[col].map(json.dumps)
 
-df["classification"] = df.apply(classify_article, axis=1)
+    df.to_csv(args.output, index=False)
 
-df.to_csv("sentiment.csv", index=False)
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Classify scraped articles with FinBERT")
+    parser.add_argument("--input", default="selenium_yahoo_finance.jsonl", help="Scraped JSONL file")
+    parser.add_argument("--output", default="sentiment.csv", help="Classified CSV for the dashboard")
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,173 @@
+"""
+dedup.py
+
+Near-duplicate detection for scraped articles, run before classification,
+summarization and embedding so syndicated wire stories and light rewrites
+are only processed once.
+
+MinHash signatures over word 5-gram shingles of `content_full`, bucketed
+with LSH banding: only articles sharing a band bucket are compared, so the
+whole pass is roughly linear in the number of articles. Each cluster keeps
+one canonical record (the longest text, earliest on ties) with the other
+copies attached under `duplicates`.
+
+Usage:
+  python dedup.py --input selenium_yahoo_finance.jsonl --output articles_dedup.jsonl
+"""
+
+import argparse
+import json
+import re
+import zlib
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+# ────────────────────────────────────────────────────────────
+# CONFIGURATION
+# ────────────────────────────────────────────────────────────
+
+SHINGLE_WORDS        = 5
+NUM_PERM             = 128
+BANDS                = 16      # 16 bands x 8 rows: pairs above ~0.7 Jaccard collide
+SIMILARITY_THRESHOLD = 0.8     # estimated Jaccard needed to call two articles copies
+SEED                 = 1
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# multiply-shift hash family: h(x) = (a * x + b) >> 32 over wrapping uint64
+_rng    = np.random.default_rng(SEED)
+_PERM_A = _rng.integers(0, 1 << 64, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_PERM_B = _rng.integers(0, 1 << 64, size=NUM_PERM, dtype=np.uint64)
+_SHIFT  = np.uint64(32)
+
+# ────────────────────────────────────────────────────────────
+# HELPERS
+# ────────────────────────────────────────────────────────────
+
+def _as_text(value: Any) -> str:
+    # pandas hands us NaN for missing cells, which is truthy
+    return value if isinstance(value, str) else ""
+
+def _article_text(rec: Dict[str, Any]) -> str:
+    return _as_text(rec.get("content_full")) or _as_text(rec.get("summary")) or _as_text(rec.get("title"))
+
+def _shingles(text: str) -> np.ndarray:
+    """
+    crc32 hashes of overlapping word n-grams; short texts fall back to
+    single words so they can still match each other.
+    """
+    words = _WORD_RE.findall(text.lower())
+    n = SHINGLE_WORDS if len(words) >= SHINGLE_WORDS else 1
+    grams = {" ".join(words[i:i + n]) for i in range(len(words) - n + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams),
+                       dtype=np.uint64, count=len(grams))
+
+def minhash(text: str) -> np.ndarray:
+    """(NUM_PERM,) MinHash signature, or an empty array for empty text."""
+    shingles = _shingles(text)
+    if not len(shingles):
+        return np.empty(0, dtype=np.uint64)
+    # hash every shingle under every permutation, keep the column minimum
+    hashed = (np.outer(shingles, _PERM_A) + _PERM_B) >> _SHIFT
+    return hashed.min(axis=0)
+
+def _find(parent: List[int], i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+# ────────────────────────────────────────────────────────────
+# PUBLIC API
+# ────────────────────────────────────────────────────────────
+
+def cluster(texts: List[str], threshold: float = SIMILARITY_THRESHOLD) -> List[List[int]]:
+    """
+    Group indices of near-duplicate texts. Every index appears in
+    exactly one cluster; unique texts form singleton clusters.
+    """
+    sigs   = [minhash(t) for t in texts]
+    parent = list(range(len(texts)))
+    rows   = NUM_PERM // BANDS
+
+    for band in range(BANDS):
+        buckets: Dict[bytes, int] = {}
+        for i, sig in enumerate(sigs):
+            if not len(sig):
+                continue
+            key = sig[band * rows:(band + 1) * rows].tobytes()
+            first = buckets.setdefault(key, i)
+            if first == i:
+                continue
+            # compare to the bucket's first member only, which keeps big
+            # syndication clusters linear instead of all-pairs
+            ri, rf = _find(parent, i), _find(parent, first)
+            if ri != rf and np.mean(sig == sigs[first]) >= threshold:
+                parent[ri] = rf
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(texts)):
+        groups.setdefault(_find(parent, i), []).append(i)
+    return list(groups.values())
+
+def deduplicate(records: List[Dict[str, Any]],
+                threshold: float = SIMILARITY_THRESHOLD) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Collapse near-duplicate articles. Returns (canonical_records, report);
+    each canonical record gains `duplicates` (id/url/title of the copies
+    it stands for) and `cluster_size`.
+    """
+    texts    = [_article_text(r) for r in records]
+    clusters = cluster(texts, threshold)
+
+    canonical = []
+    for members in sorted(clusters, key=min):
+        # longest text wins; earliest timestamp (then input order) breaks ties
+        best = min(members, key=lambda i: (-len(texts[i]),
+                                           _as_text(records[i].get("timestamp")) or "~", i))
+        rec = dict(records[best])
+        rec["duplicates"] = [
+            {"id": records[i].get("id"), "url": records[i].get("url"), "title": records[i].get("title")}
+            for i in members if i != best
+        ]
+        rec["cluster_size"] = len(members)
+        canonical.append(rec)
+
+    total_chars = sum(len(t) for t in texts)
+    kept_chars  = sum(len(_article_text(r)) for r in canonical)
+    report = {
+        "input_records":        len(records),
+        "canonical_records":    len(canonical),
+        "duplicates_removed":   len(records) - len(canonical),
+        "largest_cluster":      max((len(c) for c in clusters), default=0),
+        # FinBERT runs once per article; BART and MiniLM cost scales with text length
+        "classify_calls_saved": len(records) - len(canonical),
+        "chars_saved":          total_chars - kept_chars,
+        "compute_saved_pct":    100.0 * (total_chars - kept_chars) / total_chars if total_chars else 0.0,
+    }
+    return canonical, report
+
+def format_report(report: Dict[str, Any]) -> str:
+    return (f"Dedup: {report['input_records']} → {report['canonical_records']} articles "
+            f"({report['duplicates_removed']} near-duplicates, largest cluster "
+            f"{report['largest_cluster']}); skipped {report['classify_calls_saved']} "
+            f"classifications and {report['chars_saved']:,} chars of summarization/embedding input "
+            f"(~{report['compute_saved_pct']:.1f}% of model compute)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collapse near-duplicate scraped articles")
+    parser.add_argument("--input", default="selenium_yahoo_finance.jsonl", help="Scraped JSONL file")
+    parser.add_argument("--output", default="articles_dedup.jsonl", help="Canonical-records JSONL")
+    parser.add_argument("--threshold", type=float, default=SIMILARITY_THRESHOLD,
+                        help="Estimated Jaccard similarity above which articles are merged")
+    args = parser.parse_args()
+
+    with open(args.input, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    canonical, report = deduplicate(records, args.threshold)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        for rec in canonical:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    print(format_report(report))
@@ -1,32 +1,83 @@
+import argparse
 import json
+from pathlib import Path
 from langchain.schema import Document
 from langchain_community.vectorstores import FAISS
 from langchain_huggingface import HuggingFaceEmbeddings
 
-def main():
+from dedup import deduplicate, format_report
+from lexical import BM25Index, doc_key
+from tagger import SYMBOLS_FILE, SymbolTagger, tag_records
+import telemetry
+
+FAISS_INDEX_DIR    = "faiss_index"
+LEXICAL_INDEX_FILE = "bm25_index.npz"
+
+def main(args):
+    # 1) Read your JSONL, keeping one record per near-duplicate cluster
+    with open(args.input, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    with telemetry.span("ingest.dedup", articles=len(records)):
+        records, dedup_report = deduplicate(records)
+    print(format_report(dedup_report))
+    if Path(SYMBOLS_FILE).exists():
+        with telemetry.span("ingest.tag", articles=len(records)):
+            records = tag_records(records, SymbolTagger.from_csv(SYMBOLS_FILE))
+
     docs = []
-    # 1) Read your JSONL
-    with open("selenium_yahoo_finance.jsonl", encoding="utf-8") as f:
-        for line in f:
-            obj = json.loads(line)
-            docs.append(Document(
-                page_content   = obj.get("content_full", ""),
-                metadata       = {
-                    "id":        obj.get("id"),
-                    "title":     obj.get("title"),
-                    "url":       obj.get("url"),
-                    "timestamp": obj.get("timestamp"),
-                    "ticker":    obj.get("ticker"),
-                },
-            ))
+    for obj in records:
+        docs.append(Document(
+            page_content   = obj.get("content_full", ""),
+            metadata       = {
+                "id":             obj.get("id"),
+                "title":          obj.get("title"),
+                "url":            obj.get("url"),
+                "timestamp":      obj.get("timestamp"),
+                "ticker":         obj.get("ticker"),
+                "tickers":        obj.get("tickers", []),
+                "duplicate_urls": [d["url"] for d in obj["duplicates"]],
+            },
+        ))
 
     # 2) Embed locally
-    embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-    db = FAISS.from_documents(docs, embeddings)
+    with telemetry.span("ingest.model_load"):
+        embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+
+    can_append = Path(LEXICAL_INDEX_FILE).exists() and Path(FAISS_INDEX_DIR).is_dir()
+    if args.append and not can_append:
+        print(f"--append: {LEXICAL_INDEX_FILE} or {FAISS_INDEX_DIR} missing, rebuilding both")
+    if args.append and can_append:
+        # only embed/index articles neither index has seen yet
+        lexical = BM25Index.load(LEXICAL_INDEX_FILE)
+        docs    = [d for d in docs if doc_key(d.metadata, d.page_content) not in lexical]
+        db      = FAISS.load_local(FAISS_INDEX_DIR, embeddings,
+                                   allow_dangerous_deserialization=True)
+        if docs:
+            with telemetry.span("ingest.embed_index", docs=len(docs)):
+                db.add_documents(docs)
+    else:
+        lexical = BM25Index()
+        with telemetry.span("ingest.embed_index", docs=len(docs)):
+            db = FAISS.from_documents(docs, embeddings)
+    telemetry.count("vectors_indexed", len(docs))
+
+    # 3) BM25 over titles + content for exact tokens (tickers, "Q1 earnings", ...)
+    with telemetry.span("ingest.bm25", docs=len(docs)):
+        lexical.add_many((doc_key(d.metadata, d.page_content),
+                          d.metadata.get("title") or "", d.page_content)
+                         for d in docs)
 
-    # 3) Saerch for similar multimedia documents
-    db.save_local("faiss_index")
-    print(f"Indexed {len(docs)} docs into faiss_index")
+    # 4) Saerch for similar multimedia documents
+    with telemetry.span("ingest.save"):
+        db.save_local(FAISS_INDEX_DIR)
+        lexical.save(LEXICAL_INDEX_FILE)
+    print(f"Indexed {len(docs)} docs into {FAISS_INDEX_DIR} and {LEXICAL_INDEX_FILE} "
+          f"({len(lexical)} docs total)")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Build the FAISS + BM25 article indexes")
+    parser.add_argument("--input", default="selenium_yahoo_finance.jsonl", help="Scraped JSONL file")
+    parser.add_argument("--append", action="store_true",
+                        help="Add unseen articles to the existing indexes instead of rebuilding")
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,19 @@
+"""
+keywords.py
+
+Title keyword counts stored on every scraped article (pos_count,
+neg_count). Kept free of selenium/dateparser so the offline benchmarks
+and synthetic corpus can share it with the scraper.
+"""
+
+from typing import Tuple
+
+POS_WORDS = ["up", "rise", "gain", "bull", "positive"]
+NEG_WORDS = ["down", "fall", "lose", "bear", "negative"]
+
+def count_keywords(title: str) -> Tuple[int, int]:
+    """
+    Basic sentiment scaffolding: (positive, negative) keyword hit counts in a title.
+    """
+    low = title.lower()
+    return sum(low.count(w) for w in POS_WORDS), sum(low.count(w) for w in NEG_WORDS)
@@ -0,0 +1,238 @@
+"""
+lexical.py
+
+A compact BM25 inverted index over article titles + content, built by
+ingest.py next to the FAISS index and queried by rag.py.
+
+Postings are stored on disk CSR-style in a single compressed .npz file:
+  terms, terms_offsets        vocabulary, sorted, as one UTF-8 blob + (V+1,) byte offsets
+  offsets  (V+1,)  int64, term i owns ids[offsets[i]:offsets[i+1]]
+  ids      (P,)    int32 document numbers
+  tfs      (P,)    uint16 term frequencies
+  doc_lens (N,)    int32 document lengths in tokens
+  doc_keys, doc_keys_offsets  doc_key() of each article (what rag.py uses to
+                              find the Document), packed like terms
+
+Strings are packed rather than stored as numpy `<U` arrays, which pad
+every entry to the longest one (4 bytes per character).
+
+Documents added after loading go into an in-memory delta that search
+reads alongside the base arrays and `save` merges back in.
+"""
+
+import hashlib
+import math
+import re
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# ────────────────────────────────────────────────────────────
+# CONFIGURATION
+# ────────────────────────────────────────────────────────────
+
+K1           = 1.5
+B            = 0.75
+TITLE_WEIGHT = 2       # title tokens are counted this many times
+MAX_TF       = 65_535  # uint16 ceiling for stored term frequencies
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.&'][a-z0-9]+)*")
+_STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the
+this to was were will with what which who how why when did does do about
+""".split())
+
+def doc_key(meta: dict, content: str = "") -> str:
+    """
+    Stable key shared by the FAISS docstore and the BM25 index: the
+    article id, else its url, else a hash of its content.
+    """
+    key = meta.get("id") or meta.get("url")
+    if key:
+        return key
+    return "sha1:" + hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase word tokens; keeps tickers and tokens like "q1", "s&p" and
+    "3.5" intact so exact finance terms match exactly.
+    """
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in _STOPWORDS]
+
+# ────────────────────────────────────────────────────────────
+# INDEX
+# ────────────────────────────────────────────────────────────
+
+class BM25Index:
+    def __init__(self, k1: float = K1, b: float = B):
+        self.k1 = k1
+        self.b  = b
+        self.doc_keys: List[str] = []
+        self._key_set = set()
+        self._doc_lens = array("i")
+        self._total_len = 0
+
+        # base postings (loaded from disk), CSR layout
+        self._term_row: Dict[str, int] = {}
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._ids     = np.zeros(0, dtype=np.int32)
+        self._tfs     = np.zeros(0, dtype=np.uint16)
+
+        # postings for documents added since load
+        self._delta: Dict[str, Tuple[array, array]] = {}
+        self._norm: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.doc_keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._key_set
+
+    # ─── Building ────────────────────────────────────────────
+
+    def add(self, key: str, title: str, content: str) -> bool:
+        """
+        Index one document. Returns False (and does nothing) if `key`
+        is already in the index, so re-ingesting a file is idempotent.
+        """
+        if key in self._key_set:
+            return False
+
+        counts = Counter(tokenize(content))
+        for tok in tokenize(title):
+            counts[tok] += TITLE_WEIGHT
+
+        doc_no = len(self.doc_keys)
+        for tok, tf in counts.items():
+            ids, tfs = self._delta.setdefault(tok, (array("i"), array("H")))
+            ids.append(doc_no)
+            tfs.append(min(tf, MAX_TF))
+
+        length = sum(counts.values())
+        self.doc_keys.append(key)
+        self._key_set.add(key)
+        self._doc_lens.append(length)
+        self._total_len += length
+        self._norm = None
+        return True
+
+    def add_many(self, docs: Iterable[Tuple[str, str, str]]) -> int:
+        """Index (key, title, content) triples; returns how many were new."""
+        return sum(self.add(key, title, content) for key, title, content in docs)
+
+    # ─── Querying ────────────────────────────────────────────
+
+    def _postings(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        parts_ids, parts_tfs = [], []
+        row = self._term_row.get(term)
+        if row is not None:
+            lo, hi = self._offsets[row], self._offsets[row + 1]
+            parts_ids.append(self._ids[lo:hi])
+            parts_tfs.append(self._tfs[lo:hi])
+        if term in self._delta:
+            ids, tfs = self._delta[term]
+            parts_ids.append(np.frombuffer(ids, dtype=np.int32))
+            parts_tfs.append(np.frombuffer(tfs, dtype=np.uint16))
+        if not parts_ids:
+            return None
+        if len(parts_ids) == 1:
+            return parts_ids[0], parts_tfs[0]
+        return np.concatenate(parts_ids), np.concatenate(parts_tfs)
+
+    def _length_norm(self) -> np.ndarray:
+        # k1 * (1 - b + b * dl / avgdl), cached until the next add()
+        if self._norm is None:
+            lens  = np.frombuffer(self._doc_lens, dtype=np.int32).astype(np.float32)
+            avgdl = self._total_len / len(lens)
+            self._norm = self.k1 * (1 - self.b + self.b * lens / avgdl)
+        return self._norm
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """
+        Return up to k (doc_key, score) pairs, best first. Only documents
+        sharing at least one query term are returned.
+        """
+        n_docs = len(self.doc_keys)
+        if not n_docs:
+            return []
+
+        norm   = self._length_norm()
+        scores = np.zeros(n_docs, dtype=np.float32)
+        for term in set(tokenize(query)):
+            postings = self._postings(term)
+            if postings is None:
+                continue
+            ids, tfs = postings
+            tf  = tfs.astype(np.float32)
+            df  = len(ids)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            # a document appears at most once per term, so fancy-index += is safe
+            scores[ids] += idf * tf * (self.k1 + 1) / (tf + norm[ids])
+
+        hits = np.flatnonzero(scores)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(self.doc_keys[i], float(scores[i])) for i in hits]
+
+    # ─── Persistence ─────────────────────────────────────────
+
+    @staticmethod
+    def _pack(strings: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+    @staticmethod
+    def _unpack(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+        raw    = blob.tobytes()
+        bounds = offsets.tolist()
+        return [raw[a:b].decode("utf-8") for a, b in zip(bounds, bounds[1:])]
+
+    def save(self, path: str) -> None:
+        terms = sorted(set(self._term_row) | set(self._delta))
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        all_ids, all_tfs = [], []
+        for i, term in enumerate(terms):
+            ids, tfs = self._postings(term)
+            all_ids.append(ids)
+            all_tfs.append(tfs)
+            offsets[i + 1] = offsets[i] + len(ids)
+
+        terms_blob, terms_offsets = self._pack(terms)
+        keys_blob,  keys_offsets  = self._pack(self.doc_keys)
+        np.savez_compressed(
+            path,
+            terms            = terms_blob,
+            terms_offsets    = terms_offsets,
+            offsets          = offsets,
+            ids              = np.concatenate(all_ids) if all_ids else np.zeros(0, dtype=np.int32),
+            tfs              = np.concatenate(all_tfs) if all_tfs else np.zeros(0, dtype=np.uint16),
+            doc_lens         = np.frombuffer(self._doc_lens, dtype=np.int32),
+            doc_keys         = keys_blob,
+            doc_keys_offsets = keys_offsets,
+            params           = np.array([self.k1, self.b], dtype=np.float64),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with np.load(path, allow_pickle=False) as data:
+            k1, b = data["params"].tolist()
+            index = cls(k1=k1, b=b)
+            if "terms_offsets" in data.files:
+                terms    = cls._unpack(data["terms"], data["terms_offsets"])
+                doc_keys = cls._unpack(data["doc_keys"], data["doc_keys_offsets"])
+            else:       # indexes saved before strings were packed
+                terms, doc_keys = data["terms"].tolist(), data["doc_keys"].tolist()
+            index._term_row = {t: i for i, t in enumerate(terms)}
+            index._offsets  = data["offsets"]
+            index._ids      = data["ids"]
+            index._tfs      = data["tfs"]
+            index._doc_lens = array("i", data["doc_lens"].astype(np.int32).tobytes())
+            index.doc_keys  = doc_keys
+        index._key_set   = set(index.doc_keys)
+        index._total_len = int(sum(index._doc_lens))
+        return index
@@ -0,0 +1,223 @@
+"""
+pipeline.py
+
+Run scrape → classify → summarize and scrape → index as one DAG.
+
+Each stage is fingerprinted from the content of its input files, the
+source of the modules it runs and its command line. A stage whose
+fingerprint matches the last successful run (and whose outputs still
+exist) is skipped. Stages whose dependencies are done run concurrently,
+so FinBERT classification and FAISS/BM25 indexing overlap.
+
+Every run writes a per-stage timing report to pipeline_runs/run-<ts>.json
+and each stage's output to pipeline_runs/run-<ts>/<stage>.log.
+
+Usage:
+  python pipeline.py                         # full run, scraping fresh news
+  python pipeline.py --skip scrape           # reuse the last scrape
+  python pipeline.py --force index           # rebuild the index even if unchanged
+  python pipeline.py --telemetry telemetry    # per-stage traces + .prom files, see telemetry.py
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple
+
+# ────────────────────────────────────────────────────────────
+# CONFIGURATION
+# ────────────────────────────────────────────────────────────
+
+RAW_FILE       = "selenium_yahoo_finance.jsonl"
+SENTIMENT_FILE = "sentiment.csv"
+SUMMARIES_FILE = "summaries.jsonl"
+SYMBOLS_FILE   = "symbols.csv"
+STATE_FILE     = ".pipeline_state.json"
+RUNS_DIR       = "pipeline_runs"
+
+class Stage(NamedTuple):
+    name:     str
+    command:  List[str]
+    inputs:   List[str]          # files/dirs whose content decides whether to rerun
+    outputs:  List[str]
+    code:     List[str]          # modules whose source is part of the fingerprint
+    deps:     List[str] = []
+    volatile: bool = False       # no inputs to fingerprint (scraping): always runs unless skipped
+
+def build_stages(args) -> List[Stage]:
+    py = sys.executable
+    return [
+        Stage("scrape",
+              [py, "selenium_financial.py", "--driver", args.driver, "--output", RAW_FILE,
+               "--format", "jsonl", "--timestamp"],
+              inputs=[], outputs=[RAW_FILE],
+              code=["selenium_financial.py", "keywords.py"], volatile=True),
+        Stage("classify",
+              [py, "dataPrep.py", "--input", RAW_FILE, "--output", SENTIMENT_FILE],
+              inputs=[RAW_FILE, SYMBOLS_FILE], outputs=[SENTIMENT_FILE],
+              code=["dataPrep.py", "dedup.py", "tagger.py", "sentiment_store.py"],
+              deps=["scrape"]),
+        Stage("summarize",
+              [py, "summarizer.py", "--input", SENTIMENT_FILE, "--output", SUMMARIES_FILE],
+              inputs=[SENTIMENT_FILE], outputs=[SUMMARIES_FILE],
+              code=["summarizer.py"], deps=["classify"]),
+        Stage("index",
+              [py, "ingest.py", "--input", RAW_FILE],
+              inputs=[RAW_FILE, SYMBOLS_FILE], outputs=["faiss_index", "bm25_index.npz"],
+              code=["ingest.py", "dedup.py", "tagger.py", "lexical.py"],
+              deps=["scrape"]),
+    ]
+
+# ────────────────────────────────────────────────────────────
+# FINGERPRINTS
+# ────────────────────────────────────────────────────────────
+
+def _hash_path(h: "hashlib._Hash", path: Path) -> None:
+    if path.is_dir():
+        for child in sorted(p for p in path.rglob("*") if p.is_file()):
+            h.update(str(child.relative_to(path)).encode("utf-8"))
+            _hash_path(h, child)
+    elif path.exists():
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    else:
+        h.update(b"<missing>")
+
+def fingerprint(stage: Stage) -> str:
+    h = hashlib.sha256()
+    h.update(json.dumps(stage.command[1:]).encode("utf-8"))   # not the interpreter path
+    for path in [*stage.code, *stage.inputs]:
+        h.update(path.encode("utf-8"))
+        _hash_path(h, Path(path))
+    return h.hexdigest()
+
+def load_state() -> Dict[str, str]:
+    if not Path(STATE_FILE).exists():
+        return {}
+    with open(STATE_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_state(state: Dict[str, str]) -> None:
+    tmp = Path(STATE_FILE + ".tmp")
+    tmp.write_text(json.dumps(state, indent=2), encoding="utf-8")
+    tmp.replace(STATE_FILE)
+
+# ────────────────────────────────────────────────────────────
+# EXECUTION
+# ────────────────────────────────────────────────────────────
+
+def run_stage(stage: Stage, log_dir: Path) -> Dict[str, Any]:
+    started = time.time()
+    with open(log_dir / f"{stage.name}.log", "w", encoding="utf-8") as log:
+        proc = subprocess.run(stage.command, stdout=log, stderr=subprocess.STDOUT)
+    return {
+        "status":     "ok" if proc.returncode == 0 else "failed",
+        "returncode": proc.returncode,
+        "started":    started,
+        "seconds":    time.time() - started,
+    }
+
+def run_pipeline(stages: List[Stage], skip: List[str], force: List[str],
+                 max_workers: int) -> Dict[str, Any]:
+    # pid keeps two runs started in the same second from sharing a log dir
+    run_id  = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}-{os.getpid()}"
+    log_dir = Path(RUNS_DIR) / f"run-{run_id}"
+    log_dir.mkdir(parents=True, exist_ok=True)
+
+    state   = load_state()
+    results: Dict[str, Dict[str, Any]] = {}
+    running = {}
+    wall    = time.time()
+
+    def ready(stage: Stage) -> bool:
+        in_flight = {name for name, _ in running.values()}
+        return (stage.name not in results and stage.name not in in_flight
+                and all(d in results for d in stage.deps))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while len(results) < len(stages):
+            for stage in filter(ready, stages):
+                if any(results[d]["status"] in ("failed", "blocked") for d in stage.deps):
+                    results[stage.name] = {"status": "blocked", "seconds": 0.0}
+                    continue
+
+                fp = fingerprint(stage)
+                outputs_exist = all(Path(p).exists() for p in stage.outputs)
+                if stage.name in skip:
+                    status = "skipped" if outputs_exist else "blocked"
+                    results[stage.name] = {"status": status, "seconds": 0.0, "fingerprint": fp}
+                    continue
+                up_to_date = (not stage.volatile and outputs_exist
+                              and state.get(stage.name) == fp and stage.name not in force)
+                if up_to_date:
+                    logging.info(f"[{stage.name}] unchanged, skipping")
+                    results[stage.name] = {"status": "cached", "seconds": 0.0, "fingerprint": fp}
+                    continue
+
+                logging.info(f"[{stage.name}] running: {' '.join(stage.command[1:])}")
+                running[pool.submit(run_stage, stage, log_dir)] = (stage.name, fp)
+
+            if not running:
+                if not any(map(ready, stages)) and len(results) < len(stages):
+                    raise RuntimeError("pipeline stalled: check stage dependencies")
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name, fp = running.pop(fut)
+                result   = fut.result()
+                result["fingerprint"] = fp
+                if result["status"] == "ok":
+                    state[name] = fp
+                    save_state(state)
+                logging.info(f"[{name}] {result['status']} in {result['seconds']:.1f}s")
+                results[name] = result
+
+    report = {
+        "run_id":       run_id,
+        "wall_seconds": time.time() - wall,
+        "stages":       {s.name: results[s.name] for s in stages},
+        "log_dir":      str(log_dir),
+    }
+    with open(Path(RUNS_DIR) / f"run-{run_id}.json", "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [f"Pipeline run {report['run_id']} ({report['wall_seconds']:.1f}s wall)"]
+    for name, res in report["stages"].items():
+        lines.append(f"  {name:<10} {res['status']:<8} {res['seconds']:8.1f}s")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the MarketDigest pipeline as a DAG")
+    parser.add_argument("--driver", default="./chromedriver.exe", help="Path to chromedriver")
+    parser.add_argument("--skip", action="append", default=[], metavar="STAGE",
+                        help="Don't run STAGE; reuse its existing outputs (repeatable)")
+    parser.add_argument("--force", action="append", default=[], metavar="STAGE",
+                        help="Run STAGE even if its fingerprint is unchanged (repeatable)")
+    parser.add_argument("--workers", type=int, default=2, help="Stages run concurrently")
+    parser.add_argument("--telemetry", metavar="DIR",
+                        help="Have every stage write timing traces and Prometheus metrics to DIR")
+    args = parser.parse_args()
+    if args.telemetry:
+        os.environ["MARKETDIGEST_TELEMETRY"] = args.telemetry    # inherited by the stage processes
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    stages = build_stages(args)
+    unknown = set(args.skip + args.force) - {s.name for s in stages}
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+
+    report = run_pipeline(stages, args.skip, args.force, args.workers)
+    print(format_report(report))
+    if any(r["status"] in ("failed", "blocked") for r in report["stages"].values()):
+        sys.exit(1)
@@ -1,11 +1,17 @@
 # rag.py
 
 import pickle
+import queue
 import re
-from typing import List, Dict, Any, Tuple
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 from langchain_community.vectorstores import FAISS
 from langchain_huggingface import HuggingFaceEmbeddings
 
+from lexical import BM25Index, doc_key, tokenize
+import telemetry
+
 # ────────────────────────────────────────────────────────────
 # CONFIGURATION
 # ────────────────────────────────────────────────────────────
@@ -14,29 +20,73 @@ EMBED_MODEL     = "all-MiniLM-L6-v2"
 QA_MODEL_NAME   = "google/flan-t5-base"
 FAISS_INDEX_DIR = "faiss_index"
 FAISS_META_FILE = "faiss_meta.pkl"
+LEXICAL_INDEX_FILE = "bm25_index.npz"
+
+TOP_K              = 5
+FUSION_CANDIDATES  = 20   # hits taken from each retriever before fusing
+RRF_K              = 60   # reciprocal rank fusion damping constant
+SHORT_QUERY_TERMS  = 2    # queries this short go lexical-only when BM25 finds hits
 
 # ────────────────────────────────────────────────────────────
-# 1) Load embeddings + index + metadata
+# 1) Load embeddings + index + metadata (on first retrieval)
 # ────────────────────────────────────────────────────────────
 
-embeddings = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
+embeddings   = None
+db           = None
+_METADATA    = None
+_lexical     = None
+_DOCS_BY_KEY: Dict[str, Any] = {}
+_store_lock  = threading.Lock()
+
+def use_store(embedder, vector_db, lexical=None) -> None:
+    """
+    Install the retrieval backends: an embeddings object, a LangChain
+    FAISS store and an optional BM25Index. The on-disk loader goes
+    through here, and benchmarks use it to swap in stand-in models.
+    """
+    global embeddings, db, _lexical, _DOCS_BY_KEY
+    # lexical hits come back as keys; map them to the Documents FAISS already stores
+    docs_by_key = {
+        doc_key(doc.metadata, doc.page_content): doc
+        for doc in (vector_db.docstore.search(_id) for _id in vector_db.index_to_docstore_id.values())
+    }
+    embeddings, _lexical, _DOCS_BY_KEY = embedder, lexical, docs_by_key
+    # `db` last: _ensure_store's unlocked fast path treats it as "fully loaded"
+    db = vector_db
 
-db = FAISS.load_local(
-    FAISS_INDEX_DIR,
-    embeddings,
-    allow_dangerous_deserialization=True
-)
+def _ensure_store() -> None:
+    global _METADATA
+    if db is not None:
+        return
+    with _store_lock:
+        if db is not None:
+            return
+        with telemetry.span("rag.load_store"):
+            embedder = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
+            vector_db = FAISS.load_local(
+                FAISS_INDEX_DIR,
+                embedder,
+                allow_dangerous_deserialization=True
+            )
 
-with open(FAISS_META_FILE, "rb") as f:
-    _METADATA = pickle.load(f)
+            if Path(FAISS_META_FILE).exists():
+                with open(FAISS_META_FILE, "rb") as f:
+                    _METADATA = pickle.load(f)
 
-_retriever = db.as_retriever(search_kwargs={"k": 5})
+            # BM25 index is optional so an older ingest (FAISS only) still works
+            lexical = BM25Index.load(LEXICAL_INDEX_FILE) if Path(LEXICAL_INDEX_FILE).exists() else None
+            use_store(embedder, vector_db, lexical)
 
 # ────────────────────────────────────────────────────────────
 # 2) Lazy‐load FLAN-T5 pipeline on first use
 # ────────────────────────────────────────────────────────────
 
+MAX_ANSWER_LENGTH    = 250
+STREAM_TIMEOUT_S     = 60   # longest wait for the next decoded piece before giving up
+GENERATION_TIMEOUT_S = 60   # a generation batch stops decoding after this long
+
 _qa_pipe = None
+_qa_lock = threading.Lock()
 
 def _get_qa_pipe():
     from transformers import pipeline, AutoTokenizer, AutoModelForSeq2SeqLM
@@ -49,6 +99,29 @@ def _get_qa_pipe():
         device_map="auto"
     )
 
+def _ensure_qa_pipe():
+    """
+    Load the FLAN-T5 pipeline exactly once, even if several threads
+    (e.g. a background warm-up and the first query) race for it.
+    """
+    global _qa_pipe
+    if _qa_pipe is None:
+        with _qa_lock:
+            if _qa_pipe is None:
+                with telemetry.span("rag.load_qa"):
+                    _qa_pipe = _get_qa_pipe()
+    return _qa_pipe
+
+def warm_up() -> None:
+    """
+    Load the retrieval store and the QA model and run one tiny generation,
+    so the first real query doesn't pay for weight loading or first-call
+    graph setup.
+    """
+    _ensure_store()
+    pipe = _ensure_qa_pipe()
+    pipe("Answer: ok", max_length=4, do_sample=False)
+
 # ────────────────────────────────────────────────────────────
 # 3) Public function
 # ────────────────────────────────────────────────────────────
@@ -62,21 +135,11 @@ def trim_to_sentence(text: str) -> str:
         return text[:last_punct].strip()
     return text.strip()  
 
-def answer_query(query: str) -> Tuple[str, List[Dict[str, Any]]]:
-    """
-    1) retrieve top-k articles
-    2) build prompt from titles+content
-    3) generate answer with FLAN-T5, trim to last complete sentence
-    """
-    global _qa_pipe
-    if _qa_pipe is None:
-        _qa_pipe = _get_qa_pipe()
-
-    docs = _retriever.get_relevant_documents(query)
+def _build_prompt(query: str, docs) -> str:
     context = "\n\n".join(f"{i+1}. {d.metadata['title']}\n{d.page_content}"
                           for i, d in enumerate(docs))
 
-    prompt = (
+    return (
         "Based ONLY on the following article snippets, answer the question below. "
         "Do not use any outside knowledge. If the answer is not found in the snippets, respond: 'Not found in the provided articles.'\n\n"
         f"{context}\n\n"
@@ -85,10 +148,206 @@ def answer_query(query: str) -> Tuple[str, List[Dict[str, Any]]]:
         "Answer:"
     )
 
-    out = _qa_pipe(prompt, max_length=250, truncation=True, do_sample=False)
-    answer = out[0]["generated_text"].strip()
-    answer = trim_to_sentence(answer)  # <--- NEW: trim at last sentence-ending punctuation
+def _lexical_search(query: str, k: int = FUSION_CANDIDATES) -> List[Any]:
+    if _lexical is None:
+        return []
+    return [_DOCS_BY_KEY[key] for key, _ in _lexical.search(query, k) if key in _DOCS_BY_KEY]
+
+def _rrf_fuse(rankings: List[List[Any]], k: int = TOP_K) -> List[Any]:
+    """
+    Reciprocal rank fusion: score(d) = sum over lists of 1 / (RRF_K + rank).
+    """
+    scores: Dict[str, float] = {}
+    by_key: Dict[str, Any]   = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = doc_key(doc.metadata, doc.page_content)
+            by_key.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank)
+    best = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [by_key[key] for key in best]
+
+def _is_short(query: str) -> bool:
+    return len(tokenize(query)) <= SHORT_QUERY_TERMS
+
+def retrieve(query: str) -> List[Any]:
+    """
+    Hybrid retrieval: BM25 + MiniLM/FAISS fused with RRF. Very short
+    queries (a ticker, a company name) skip the embedding entirely when
+    BM25 already has matches.
+    """
+    return retrieve_batch([query])[0]
+
+def retrieve_batch(queries: List[str]) -> List[List[Any]]:
+    """
+    Hybrid retrieval for several queries, embedding all the ones that
+    need a vector search in one batched call.
+    """
+    _ensure_store()
+    with telemetry.span("rag.lexical_search", queries=len(queries)):
+        lexical_hits = [_lexical_search(q) for q in queries]
+    needs_vector = [i for i, q in enumerate(queries)
+                    if not (lexical_hits[i] and _is_short(q))]
+    telemetry.count("lexical_only_queries", len(queries) - len(needs_vector))
+
+    vector_hits: Dict[int, List[Any]] = {}
+    if needs_vector:
+        with telemetry.span("rag.embed_queries", queries=len(needs_vector)):
+            vectors = embeddings.embed_documents([queries[i] for i in needs_vector])
+        with telemetry.span("rag.vector_search", queries=len(needs_vector)):
+            for i, v in zip(needs_vector, vectors):
+                vector_hits[i] = db.similarity_search_by_vector(v, k=FUSION_CANDIDATES)
+        # flat index: every query is compared against every stored vector
+        telemetry.count("vectors_searched", len(needs_vector) * db.index.ntotal)
+
+    return [_rrf_fuse([vector_hits.get(i, []), lexical_hits[i]]) for i in range(len(queries))]
+
+class _BatchSink:
+    """
+    generate() streamer for a whole batch: routes each row's newly
+    decoded text to `sinks[row]` (None rows are skipped). Text is held
+    back to the last space so word pieces aren't split across calls.
+    """
+    def __init__(self, tokenizer, sinks: List[Optional[Callable[[str], None]]]):
+        self.tokenizer = tokenizer
+        self.sinks     = sinks
+        self.ids       = [[] for _ in sinks]
+        self.sent      = [0] * len(sinks)
+        self.started   = False
+
+    def _flush(self, row: int, final: bool) -> None:
+        text = self.tokenizer.decode(self.ids[row], skip_special_tokens=True)
+        end  = len(text) if final else text.rfind(" ") + 1
+        if end > self.sent[row]:
+            self.sinks[row](text[self.sent[row]:end])
+            self.sent[row] = end
+
+    def put(self, value) -> None:
+        # generate() first hands over the decoder start tokens, not output
+        if not self.started:
+            self.started = True
+            return
+        for row, token_id in enumerate(value.reshape(-1).tolist()):
+            if self.sinks[row] is not None:
+                self.ids[row].append(token_id)
+                self._flush(row, final=False)
+
+    def end(self) -> None:
+        for row, sink in enumerate(self.sinks):
+            if sink is not None:
+                self._flush(row, final=True)
+
+def generate_answers(queries: List[str], docs_list: List[List[Any]],
+                     sinks: Optional[List[Optional[Callable[[str], None]]]] = None,
+                     cancelled: Optional[List[Optional[threading.Event]]] = None) -> List[str]:
+    """
+    Generate one answer per (query, docs) pair in a single batched
+    FLAN-T5 call, each trimmed to its last complete sentence.
+
+    `sinks[i]`, when given, is called with each newly decoded piece of
+    answer i while the batch decodes. Decoding stops early once every
+    row's `cancelled[i]` event is set, and after GENERATION_TIMEOUT_S.
+    """
+    from transformers import StoppingCriteria, StoppingCriteriaList
+
+    class _AllCancelled(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs) -> bool:
+            return all(ev is not None and ev.is_set() for ev in cancelled)
+
+    qa_pipe = _ensure_qa_pipe()
+    tok     = qa_pipe.tokenizer
+    prompts = [_build_prompt(q, docs) for q, docs in zip(queries, docs_list)]
+    inputs  = tok(prompts, return_tensors="pt", padding=True, truncation=True)
+    inputs  = {k: v.to(qa_pipe.model.device) for k, v in inputs.items()}
+
+    kwargs: Dict[str, Any] = {"max_length": MAX_ANSWER_LENGTH, "do_sample": False,
+                              "max_time": GENERATION_TIMEOUT_S}
+    if sinks and any(s is not None for s in sinks):
+        kwargs["streamer"] = _BatchSink(tok, sinks)
+    if cancelled and any(ev is not None for ev in cancelled):
+        kwargs["stopping_criteria"] = StoppingCriteriaList([_AllCancelled()])
+
+    with telemetry.span("rag.generate", batch=len(prompts)):
+        output_ids = qa_pipe.model.generate(**inputs, **kwargs)
+    texts = tok.batch_decode(output_ids, skip_special_tokens=True)
+    if telemetry.enabled:
+        telemetry.count("tokens_generated", sum(len(tok.tokenize(t)) for t in texts))
+    return [trim_to_sentence(t.strip()) for t in texts]
+
+def answer_query(query: str) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    1) retrieve top-k articles
+    2) build prompt from titles+content
+    3) generate answer with FLAN-T5, trim to last complete sentence
+    """
+    docs    = retrieve(query)
+    answer, = generate_answers([query], [docs])
 
     sources = [d.metadata for d in docs]
     return answer, sources
 
+def stream_answer(query: str, docs: List[Any]) -> Iterator[Tuple[str, str]]:
+    """
+    Generate an answer for already-retrieved docs, yielding ("token", piece)
+    events while decoding and a final ("answer", trimmed_answer).
+    """
+    from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+
+    class _StopWhenSet(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs) -> bool:
+            return stop.is_set()
+
+    qa_pipe  = _ensure_qa_pipe()
+    tok      = qa_pipe.tokenizer
+    inputs   = tok(_build_prompt(query, docs), return_tensors="pt", truncation=True)
+    inputs   = {k: v.to(qa_pipe.model.device) for k, v in inputs.items()}
+    streamer = TextIteratorStreamer(tok, skip_special_tokens=True, timeout=STREAM_TIMEOUT_S)
+    stop     = threading.Event()
+    errors: List[BaseException] = []
+
+    def _generate():
+        # generate() blocks until done, so it runs in a worker while we drain the
+        # streamer here; if it fails, end the stream so the consumer isn't left waiting
+        try:
+            qa_pipe.model.generate(**inputs, streamer=streamer, max_length=MAX_ANSWER_LENGTH,
+                                   do_sample=False,
+                                   stopping_criteria=StoppingCriteriaList([_StopWhenSet()]))
+        except BaseException as e:
+            errors.append(e)
+            streamer.end()
+
+    worker = threading.Thread(target=_generate, daemon=True)
+    worker.start()
+
+    pieces = []
+    try:
+        with telemetry.span("rag.stream_generate"):
+            try:
+                for piece in streamer:
+                    if piece:
+                        pieces.append(piece)
+                        yield "token", piece
+            except queue.Empty:
+                raise TimeoutError(f"no output from {QA_MODEL_NAME} for {STREAM_TIMEOUT_S}s") from None
+            worker.join()
+    finally:
+        # consumer gone (generator closed), timed out or failed: stop decoding
+        stop.set()
+    if errors:
+        raise errors[0]
+
+    text = "".join(pieces).strip()
+    if telemetry.enabled:
+        telemetry.count("tokens_generated", len(tok.tokenize(text)))
+    yield "answer", trim_to_sentence(text)
+
+def answer_query_stream(query: str) -> Iterator[Tuple[str, Any]]:
+    """
+    Streaming variant of `answer_query`. Yields (kind, payload) events:
+      ("sources", [metadata, ...])  as soon as retrieval finishes
+      ("token",   text_piece)       for every decoded piece of the answer
+      ("answer",  full_answer)      once, trimmed to the last full sentence
+    """
+    docs = retrieve(query)
+    yield "sources", [d.metadata for d in docs]
+    yield from stream_answer(query, docs)
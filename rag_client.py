@@ -0,0 +1,160 @@
+"""
+rag_client.py
+
+Thin HTTP client for rag_service.py, plus a concurrent load generator.
+
+Library use (what dashboard.py does):
+    client = RAGClient("http://127.0.0.1:8765")
+    answer, sources = client.answer_query("What moved NVDA today?")
+
+Load test:
+    python rag_client.py --concurrency 16 --requests 200
+    python rag_client.py --concurrency 16 --requests 200 --stream   # /query/stream, as the dashboard calls it
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Tuple
+
+DEFAULT_URL = os.environ.get("RAG_SERVICE_URL", "http://127.0.0.1:8765")
+
+SAMPLE_QUERIES = [
+    "Which companies beat earnings estimates?",
+    "What happened to Tesla stock today?",
+    "Any analyst downgrades this morning?",
+    "How did the Fed decision affect bank stocks?",
+    "What is the outlook for chip makers?",
+    "Which stocks hit a record high?",
+]
+
+class RAGClient:
+    def __init__(self, base_url: str = DEFAULT_URL, timeout: float = 120.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout  = timeout
+
+    def _post(self, path: str, payload: Dict[str, Any]):
+        req = urllib.request.Request(
+            self.base_url + path,
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        return urllib.request.urlopen(req, timeout=self.timeout)
+
+    def health(self) -> Dict[str, Any]:
+        with urllib.request.urlopen(self.base_url + "/healthz", timeout=5) as resp:
+            return json.load(resp)
+
+    def answer_query(self, query: str) -> Tuple[str, List[Dict[str, Any]]]:
+        with self._post("/query", {"query": query}) as resp:
+            body = json.load(resp)
+        return body["answer"], body["sources"]
+
+    def answer_query_stream(self, query: str) -> Iterator[Tuple[str, Any]]:
+        """
+        Same (kind, payload) events as rag.answer_query_stream, read
+        line by line from the service's NDJSON response.
+        """
+        with self._post("/query/stream", {"query": query}) as resp:
+            for line in resp:
+                if not line.strip():
+                    continue
+                kind, payload = json.loads(line)
+                if kind == "error":
+                    raise RuntimeError(payload)
+                yield kind, payload
+
+# ────────────────────────────────────────────────────────────
+# LOAD TEST
+# ────────────────────────────────────────────────────────────
+
+def _timed_request(client: RAGClient, query: str, stream: bool = False) -> Tuple[str, float, float]:
+    """(outcome, total seconds, seconds to the first answer token or the answer)."""
+    started = time.perf_counter()
+    first   = None
+    try:
+        if stream:
+            for kind, _ in client.answer_query_stream(query):
+                if first is None and kind in ("token", "answer"):
+                    first = time.perf_counter() - started
+        else:
+            client.answer_query(query)
+        outcome = "ok"
+    except urllib.error.HTTPError as e:
+        outcome = "rejected" if e.code == 503 else f"http_{e.code}"
+    except Exception:
+        outcome = "error"
+    total = time.perf_counter() - started
+    return outcome, total, total if first is None else first
+
+def _percentiles(prefix: str, values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+
+    def pct(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+    return {
+        f"{prefix}_mean": statistics.mean(ordered) if ordered else 0.0,
+        f"{prefix}_p50":  pct(0.50),
+        f"{prefix}_p95":  pct(0.95),
+        f"{prefix}_p99":  pct(0.99),
+    }
+
+def load_test(client: RAGClient, n_requests: int, concurrency: int,
+              queries: List[str] = SAMPLE_QUERIES, stream: bool = False) -> Dict[str, Any]:
+    """
+    Fire `n_requests` at `concurrency` in parallel. With `stream`, requests
+    go to /query/stream and time-to-first-token is reported as well.
+    """
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda i: _timed_request(client, queries[i % len(queries)], stream),
+                                range(n_requests)))
+    wall = time.perf_counter() - started
+
+    ok = [(total, first) for outcome, total, first in results if outcome == "ok"]
+    outcomes: Dict[str, int] = {}
+    for outcome, _, _ in results:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    report = {
+        "endpoint":       "/query/stream" if stream else "/query",
+        "requests":       n_requests,
+        "concurrency":    concurrency,
+        "wall_seconds":   wall,
+        "throughput_rps": len(ok) / wall if wall else 0.0,
+        "outcomes":       outcomes,
+        **_percentiles("latency", [total for total, _ in ok]),
+    }
+    if stream:
+        report.update(_percentiles("first_token", [first for _, first in ok]))
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent load test for rag_service.py")
+    parser.add_argument("--url", default=DEFAULT_URL, help="Service base URL")
+    parser.add_argument("--requests", type=int, default=100, help="Total requests to send")
+    parser.add_argument("--concurrency", type=int, default=8, help="Parallel clients")
+    parser.add_argument("--query", action="append", default=None,
+                        help="Query to send (repeatable); defaults to a built-in sample set")
+    parser.add_argument("--stream", action="store_true",
+                        help="Load-test /query/stream (the dashboard's path) instead of /query")
+    args = parser.parse_args()
+
+    client = RAGClient(args.url)
+    try:
+        client.health()
+    except Exception as e:
+        print(f"Service not reachable at {args.url}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    report = load_test(client, args.requests, args.concurrency, args.query or SAMPLE_QUERIES,
+                       stream=args.stream)
+    print(json.dumps(report, indent=2))
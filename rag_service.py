@@ -0,0 +1,371 @@
+"""
+rag_service.py
+
+A local asyncio HTTP service that hosts `rag.answer_query` for every
+dashboard session, so the embeddings model, FAISS index and FLAN-T5 are
+loaded once per machine instead of once per Streamlit session.
+
+Concurrent questions are coalesced into micro-batches: requests arriving
+within BATCH_WINDOW_MS share one embedding call and one generation call.
+
+Endpoints:
+  POST /query          {"query": "..."} -> {"answer": "...", "sources": [...]}
+  POST /query/stream   {"query": "..."} -> NDJSON events, see rag.answer_query_stream
+  GET  /healthz        readiness + queue depth
+  GET  /metrics        Prometheus-style text metrics (plus rag.py's telemetry
+                       spans/counters when started with --telemetry)
+
+Usage:
+  python rag_service.py --host 127.0.0.1 --port 8765
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import rag
+import telemetry
+
+# ────────────────────────────────────────────────────────────
+# CONFIGURATION
+# ────────────────────────────────────────────────────────────
+
+DEFAULT_HOST     = "127.0.0.1"
+DEFAULT_PORT     = 8765
+BATCH_WINDOW_MS  = 20      # how long to wait for more requests to join a batch
+MAX_BATCH        = 8       # max queries per embedding / generation call
+MAX_INFLIGHT     = 64      # requests admitted at once; beyond this we answer 503
+MAX_QUERY_CHARS  = 2000
+MAX_BODY_BYTES   = 16_384
+STREAM_IDLE_TIMEOUT_S = 2 * rag.GENERATION_TIMEOUT_S   # queueing behind one batch + our own
+LATENCY_WINDOW   = 1000    # recent request latencies kept for percentiles
+
+# ────────────────────────────────────────────────────────────
+# METRICS
+# ────────────────────────────────────────────────────────────
+
+class Metrics:
+    """
+    In-process counters and recent latencies, rendered as Prometheus text.
+    """
+    def __init__(self):
+        self.counters: Dict[str, int] = {
+            "requests_total":      0,
+            "requests_rejected":   0,
+            "requests_failed":     0,
+            "batches_retrieval":   0,
+            "batches_generation":  0,
+            "batched_queries":     0,
+        }
+        self.inflight   = 0
+        self.latencies  = deque(maxlen=LATENCY_WINDOW)
+        self.batch_sizes = deque(maxlen=LATENCY_WINDOW)
+        self.queue_depth: Dict[str, Callable[[], int]] = {}
+
+    def observe_latency(self, seconds: float) -> None:
+        self.latencies.append(seconds)
+
+    def _percentile(self, q: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        sizes = list(self.batch_sizes)
+        return {
+            **self.counters,
+            "inflight":          self.inflight,
+            "latency_p50":       self._percentile(0.50),
+            "latency_p95":       self._percentile(0.95),
+            "latency_p99":       self._percentile(0.99),
+            "mean_batch_size":   (sum(sizes) / len(sizes)) if sizes else 0.0,
+            **{f"queue_depth_{k}": fn() for k, fn in self.queue_depth.items()},
+        }
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for key, value in self.snapshot().items():
+            name = f"rag_{key}"
+            kind = "counter" if key in self.counters else "gauge"
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+# ────────────────────────────────────────────────────────────
+# MICRO-BATCHING
+# ────────────────────────────────────────────────────────────
+
+class MicroBatcher:
+    """
+    Collects items submitted from many coroutines and hands them to a
+    blocking `fn(items) -> results` in groups of up to `max_batch`,
+    waiting at most `window` seconds after the first item arrives.
+    """
+    def __init__(self, name: str, fn: Callable[[List[Any]], List[Any]],
+                 executor: ThreadPoolExecutor, metrics: Metrics,
+                 window: float = BATCH_WINDOW_MS / 1000, max_batch: int = MAX_BATCH):
+        self.name      = name
+        self.fn        = fn
+        self.executor  = executor
+        self.metrics   = metrics
+        self.window    = window
+        self.max_batch = max_batch
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        metrics.queue_depth[name] = self.queue.qsize
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def submit(self, item: Any) -> Any:
+        fut = asyncio.get_running_loop().create_future()
+        await self.queue.put((item, fut))
+        return await fut
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            items = [item for item, _ in batch]
+            self.metrics.counters[f"batches_{self.name}"] += 1
+            self.metrics.counters["batched_queries"] += len(items)
+            self.metrics.batch_sizes.append(len(items))
+            try:
+                results = await loop.run_in_executor(self.executor, self.fn, items)
+            except Exception as e:
+                logging.exception(f"{self.name} batch of {len(items)} failed")
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            for (_, fut), result in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(result)
+
+# ────────────────────────────────────────────────────────────
+# SERVICE
+# ────────────────────────────────────────────────────────────
+
+def _generate_batch(items: List[Any]) -> List[str]:
+    """Items are (query, docs, sink, cancelled); sink/cancelled are None for /query."""
+    queries, docs_list, sinks, cancelled = (list(col) for col in zip(*items))
+    return rag.generate_answers(queries, docs_list, sinks=sinks, cancelled=cancelled)
+
+class RAGService:
+    def __init__(self, max_inflight: int = MAX_INFLIGHT):
+        self.max_inflight = max_inflight
+        self.metrics      = Metrics()
+        self.ready        = False
+        # retrieval (MiniLM + FAISS) and generation (FLAN-T5) get their own
+        # workers so embedding the next batch overlaps with generating this one
+        self.retrieval_pool  = ThreadPoolExecutor(max_workers=1, thread_name_prefix="retrieval")
+        self.generation_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="generation")
+
+    async def start(self, host: str, port: int) -> asyncio.AbstractServer:
+        self.retrieval = MicroBatcher("retrieval", rag.retrieve_batch,
+                                      self.retrieval_pool, self.metrics)
+        self.generation = MicroBatcher("generation", _generate_batch,
+                                       self.generation_pool, self.metrics)
+        self.retrieval.start()
+        self.generation.start()
+        asyncio.create_task(self._warm_up())
+        return await asyncio.start_server(self._handle, host, port)
+
+    async def _warm_up(self) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.generation_pool, rag.warm_up)
+        self.ready = True
+        logging.info("QA model warm, service ready")
+
+    # ─── HTTP plumbing ───────────────────────────────────────
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        if not request_line:
+            return None
+        method, path, _ = request_line.split(" ", 2)
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            key, _, value = line.partition(":")
+            headers[key.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        if length > MAX_BODY_BYTES:
+            raise ValueError("request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method, path, body
+
+    @staticmethod
+    def _response_head(status: str, content_type: str, extra: str = "") -> bytes:
+        return (f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Connection: close\r\n{extra}\r\n").encode("latin-1")
+
+    async def _send(self, writer: asyncio.StreamWriter, status: str,
+                    payload: Any, content_type: str = "application/json",
+                    extra: str = "") -> None:
+        body = payload if isinstance(payload, str) else json.dumps(payload)
+        body = body.encode("utf-8")
+        writer.write(self._response_head(status, content_type,
+                                         f"Content-Length: {len(body)}\r\n{extra}"))
+        writer.write(body)
+        await writer.drain()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            try:
+                request = await self._read_request(reader)
+            except (ValueError, asyncio.IncompleteReadError) as e:
+                await self._send(writer, "400 Bad Request", {"error": str(e)})
+                return
+            if request is None:
+                return
+            method, path, body = request
+
+            if method == "GET" and path == "/healthz":
+                await self._send(writer, "200 OK", {"ready": self.ready, **self.metrics.snapshot()})
+            elif method == "GET" and path == "/metrics":
+                text = self.metrics.render_prometheus()
+                if telemetry.enabled:
+                    text += telemetry.render_prometheus()
+                await self._send(writer, "200 OK", text, content_type="text/plain; version=0.0.4")
+            elif method == "POST" and path in ("/query", "/query/stream"):
+                await self._handle_query(writer, body, stream=path.endswith("/stream"))
+            else:
+                await self._send(writer, "404 Not Found", {"error": f"no route {method} {path}"})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    # ─── Query handling ──────────────────────────────────────
+
+    async def _handle_query(self, writer: asyncio.StreamWriter, body: bytes, stream: bool) -> None:
+        try:
+            query = str(json.loads(body or b"{}").get("query", "")).strip()
+        except (ValueError, AttributeError):
+            await self._send(writer, "400 Bad Request", {"error": "body must be JSON"})
+            return
+        if not query or len(query) > MAX_QUERY_CHARS:
+            await self._send(writer, "400 Bad Request",
+                             {"error": f"query must be 1-{MAX_QUERY_CHARS} characters"})
+            return
+
+        # backpressure: shed load instead of letting latency grow without bound
+        if self.metrics.inflight >= self.max_inflight:
+            self.metrics.counters["requests_rejected"] += 1
+            await self._send(writer, "503 Service Unavailable", {"error": "overloaded"},
+                             extra="Retry-After: 1\r\n")
+            return
+
+        self.metrics.counters["requests_total"] += 1
+        self.metrics.inflight += 1
+        started = time.perf_counter()
+        try:
+            docs = await self.retrieval.submit(query)
+            sources = [d.metadata for d in docs]
+            if stream:
+                await self._stream_answer(writer, query, docs, sources)
+            else:
+                answer = await self.generation.submit((query, docs, None, None))
+                await self._send(writer, "200 OK", {"answer": answer, "sources": sources})
+            self.metrics.observe_latency(time.perf_counter() - started)
+        except ConnectionError:
+            raise
+        except Exception as e:
+            self.metrics.counters["requests_failed"] += 1
+            logging.exception(f"Query failed: {query!r}")
+            await self._send(writer, "500 Internal Server Error", {"error": str(e)})
+        finally:
+            self.metrics.inflight -= 1
+
+    async def _stream_answer(self, writer: asyncio.StreamWriter, query: str,
+                             docs: List[Any], sources: List[Dict[str, Any]]) -> None:
+        """
+        Send NDJSON events. The query joins the same generation batches as
+        /query, with a sink that forwards its decoded pieces here. If the
+        client goes away or no piece arrives for STREAM_IDLE_TIMEOUT_S,
+        the row is cancelled so the batch can stop decoding for it.
+        """
+        loop      = asyncio.get_running_loop()
+        pieces: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
+
+        def sink(piece: str) -> None:
+            loop.call_soon_threadsafe(pieces.put_nowait, piece)
+
+        writer.write(self._response_head("200 OK", "application/x-ndjson"))
+        writer.write((json.dumps(["sources", sources]) + "\n").encode("utf-8"))
+        await writer.drain()
+
+        answer = asyncio.ensure_future(self.generation.submit((query, docs, sink, cancelled)))
+        # wakes the loop below once generation finishes, however it finishes
+        answer.add_done_callback(lambda _: pieces.put_nowait(None))
+        try:
+            try:
+                while (piece := await asyncio.wait_for(pieces.get(), STREAM_IDLE_TIMEOUT_S)) is not None:
+                    writer.write((json.dumps(["token", piece]) + "\n").encode("utf-8"))
+                    await writer.drain()
+                event = ["answer", await answer]
+            except asyncio.TimeoutError:
+                event = ["error", f"no output for {STREAM_IDLE_TIMEOUT_S}s"]
+            except ConnectionError:
+                raise
+            except Exception as e:
+                self.metrics.counters["requests_failed"] += 1
+                logging.exception(f"Streaming query failed: {query!r}")
+                event = ["error", str(e)]
+            writer.write((json.dumps(event) + "\n").encode("utf-8"))
+            await writer.drain()
+        finally:
+            # client gone, timed out or done: stop decoding this row
+            cancelled.set()
+            if not answer.done():
+                answer.cancel()
+
+# ────────────────────────────────────────────────────────────
+# ENTRY POINT
+# ────────────────────────────────────────────────────────────
+
+async def serve(host: str, port: int, max_inflight: int) -> None:
+    service = RAGService(max_inflight=max_inflight)
+    server  = await service.start(host, port)
+    logging.info(f"RAG service listening on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local batched RAG Q&A service")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Interface to bind")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on")
+    parser.add_argument("--max-inflight", type=int, default=MAX_INFLIGHT,
+                        help="Requests admitted concurrently before answering 503")
+    parser.add_argument("--telemetry", action="store_true",
+                        help="Time rag.py's stages and export them on /metrics")
+    args = parser.parse_args()
+    if args.telemetry and not telemetry.enabled:
+        telemetry.enable()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_inflight))
+    except KeyboardInterrupt:
+        pass
@@ -3,9 +3,14 @@ import csv
 import json
 import hashlib
 import logging
+import os
 import re
+import signal
+import subprocess
+import threading
 import time
 from datetime import datetime, timedelta
+from pathlib import Path
 
 import dateparser
 from datetime import datetime, timedelta, timezone
@@ -13,9 +18,28 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import WebDriverException
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+from keywords import count_keywords
+import telemetry
+
+try:
+    import psutil       # optional: browser memory for the daemon's recycle trigger
+except ImportError:
+    psutil = None
+
+TICKER_PATTERN = re.compile(r'\(([A-Z]{1,5})\)')
+
+# daemon mode
+SEEN_IDS_FILE   = "seen_ids.txt"
+CYCLES_FILE     = "cycles.jsonl"     # one line of latency stats per poll
+RECYCLE_PAGES   = 300                # relaunch the browser after this many page loads
+RECYCLE_RSS_MB  = 1024               # ... or once chromedriver + Chrome RSS has grown this much
+PAGE_TIMEOUT_S  = 30                 # daemon: a hung page fails after this instead of WebDriver's 300s
+DETAIL_RETRIES  = 3                  # cycles a failing or empty article is retried before giving up
+
 def setup_logging(log_file: str):
     logging.basicConfig(
         level=logging.INFO,
@@ -42,58 +66,82 @@ def extract_detail(driver: webdriver.Chrome, url: str):
     Returns (timestamp_iso, full_text).
     """
     original = driver.current_window_handle
-    driver.execute_script("window.open('');")
-    driver.switch_to.window(driver.window_handles[-1])
-    driver.get(url)
-
     ts, full = None, ""
     try:
-        # wait for the <time> element
-        elem = WebDriverWait(driver, 5).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, 'time'))
-        )
-        raw = elem.get_attribute('datetime') or elem.text
-        # ISO? or relative?
-        if raw and raw[0:4].isdigit():
-            ts = raw  # ISO8601
-        else:
-            dt = parse_timestamp_text(raw)
-            ts = dt.isoformat() + 'Z'
-        # get full article paragraphs
-        paras = driver.find_elements(By.CSS_SELECTOR, 'article p')
-        full = "\n\n".join(p.text for p in paras)
-    except Exception as e:
-        logging.warning(f"Detail scrape failed for {url}: {e}")
+        # a failed page load propagates, but the tab is still closed below
+        driver.execute_script("window.open('');")
+        driver.switch_to.window(driver.window_handles[-1])
+        with telemetry.span("scrape.article_load"):
+            driver.get(url)
+        telemetry.count("pages_fetched")
+
+        try:
+            # wait for the <time> element
+            elem = WebDriverWait(driver, 5).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, 'time'))
+            )
+            raw = elem.get_attribute('datetime') or elem.text
+            # ISO? or relative?
+            if raw and raw[0:4].isdigit():
+                ts = raw  # ISO8601
+            else:
+                dt = parse_timestamp_text(raw)
+                ts = dt.isoformat() + 'Z'
+            # get full article paragraphs
+            paras = driver.find_elements(By.CSS_SELECTOR, 'article p')
+            full = "\n\n".join(p.text for p in paras)
+        except Exception as e:
+            logging.warning(f"Detail scrape failed for {url}: {e}")
+            telemetry.count("article_detail_failures")
     finally:
-        driver.close()
+        if driver.current_window_handle != original:
+            driver.close()
         driver.switch_to.window(original)
 
     return ts, full
 
-def main(args):
-    setup_logging(args.log)
-    logging.info("Starting scraper")
-
-    # Chrome webdriver setup
+def make_driver(args, own_session: bool = False,
+                page_load_timeout: float = None) -> webdriver.Chrome:
+    """
+    Start Chrome. With `own_session`, chromedriver (and the Chrome it
+    spawns) runs outside our process group, so a terminal Ctrl+C reaches
+    only Python and the daemon can finish its article before quitting it.
+    """
     chrome_opts = Options()
     if not args.debug:
         chrome_opts.add_argument("--headless")
         chrome_opts.add_argument("--disable-gpu")
     chrome_opts.add_argument("--ignore-certificate-errors")
     service = Service(args.driver)
-    driver = webdriver.Chrome(service=service, options=chrome_opts)
+    if own_session:
+        if os.name == "nt":
+            service.creation_flags = subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            service.popen_kw = {"start_new_session": True}
+    with telemetry.span("scrape.browser_start"):
+        driver = webdriver.Chrome(service=service, options=chrome_opts)
+    if page_load_timeout:
+        driver.set_page_load_timeout(page_load_timeout)
+    return driver
 
-    # Load page and scroll
-    driver.get(args.url)
+def load_listing(driver: webdriver.Chrome, args):
+    """
+    Load and scroll the news listing. Returns (title, url, summary) per
+    story, or None if no stories appeared in time.
+    """
+    with telemetry.span("scrape.listing_load"):
+        driver.get(args.url)
+    telemetry.count("pages_fetched")
     logging.info(f"Navigated to {args.url}")
-    last_height = driver.execute_script("return document.body.scrollHeight")
-    for _ in range(args.scrolls):
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(args.pause)
-        new_height = driver.execute_script("return document.body.scrollHeight")
-        if new_height == last_height:
-            break
-        last_height = new_height
+    with telemetry.span("scrape.scroll", scrolls=args.scrolls):
+        last_height = driver.execute_script("return document.body.scrollHeight")
+        for _ in range(args.scrolls):
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            time.sleep(args.pause)
+            new_height = driver.execute_script("return document.body.scrollHeight")
+            if new_height == last_height:
+                break
+            last_height = new_height
     logging.info("Completed scrolling")
 
     # Wait for articles
@@ -104,83 +152,124 @@ def main(args):
     except Exception as e:
         logging.error(f"Timeout waiting for articles: {e}")
         driver.save_screenshot("timeout_error.png")
-        driver.quit()
-        return
+        return None
 
     elems = driver.find_elements(By.CSS_SELECTOR, 'li.stream-item.story-item')
     logging.info(f"Found {len(elems)} article elements")
 
-    data = []
-    pos_words = ["up", "rise", "gain", "bull", "positive"]
-    neg_words = ["down", "fall", "lose", "bear", "negative"]
-    ticker_pattern = re.compile(r'\(([A-Z]{1,5})\)')
-
+    # read everything off the listing before opening any article tab
+    stories = []
     for idx, el in enumerate(elems, start=1):
         try:
             title   = el.find_element(By.CSS_SELECTOR, 'h3').text.strip()
             url     = el.find_element(By.CSS_SELECTOR, 'a').get_attribute('href')
             summary = el.find_element(By.CSS_SELECTOR, 'p').text.strip() if el.find_elements(By.CSS_SELECTOR, 'p') else ""
-            timestamp, content_full = extract_detail(driver, url)
-
-
-            # Unique stable ID from URL
-            uid = hashlib.sha1(url.encode('utf-8')).hexdigest()
-
-            # Extract ticker if present
-            match  = ticker_pattern.search(title)
-            ticker = match.group(1) if match else None
-
-            # Basic sentiment scaffolding
-            low       = title.lower()
-            pos_count = sum(low.count(w) for w in pos_words)
-            neg_count = sum(low.count(w) for w in neg_words)
-
-            record = {
-                "id": uid,
-                "title": title,
-                "url": url,
-                "ticker": ticker,
-                "timestamp": timestamp,
-                "summary": summary,
-                "content_full": content_full,
-                "pos_count": pos_count,
-                "neg_count": neg_count,
-            }
-            data.append(record)
+            stories.append((title, url, summary))
+        except Exception as e:
+            logging.error(f"Error on article #{idx}: {e}")
+            telemetry.count("article_errors")
+    return stories
+
+def article_id(url: str) -> str:
+    """Unique stable ID from URL."""
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+def scrape_article(driver: webdriver.Chrome, title: str, url: str, summary: str):
+    with telemetry.span("scrape.article"):
+        timestamp, content_full = extract_detail(driver, url)
+
+    # Extract ticker if present
+    match  = TICKER_PATTERN.search(title)
+    ticker = match.group(1) if match else None
+
+    # Basic sentiment scaffolding
+    pos_count, neg_count = count_keywords(title)
+
+    telemetry.count("articles_scraped")
+    return {
+        "id": article_id(url),
+        "title": title,
+        "url": url,
+        "ticker": ticker,
+        "timestamp": timestamp,
+        "summary": summary,
+        "content_full": content_full,
+        "pos_count": pos_count,
+        "neg_count": neg_count,
+    }
+
+def filter_recent(data, args):
+    """
+    Keep records published since --start-date, or within the last 24 hours.
+    """
+    # use a timezone-aware “now”
+    now = datetime.now(timezone.utc)
+    # if user passed --start-date, use that; otherwise go back 24h
+    if args.start_date:
+        cutoff = datetime.fromisoformat(
+            args.start_date.replace('Z', '+00:00')
+        )
+    else:
+        cutoff = now - timedelta(hours=24)
+
+    before = len(data)
+    filtered = []
+    for rec in data:
+        ts = rec.get('timestamp')
+        if not ts:
+            continue
+        # parse ISO8601 into UTC-aware datetime
+        dt = datetime.fromisoformat(ts.replace('Z', '+00:00'))
+        if dt >= cutoff:
+            filtered.append(rec)
+    logging.info(
+        f"Filtered articles: {len(filtered)} of {before} "
+        f"kept since {cutoff.isoformat()}Z"
+    )
+    return filtered
+
+def write_records(data, path: str, fmt: str, append: bool = False):
+    exists = os.path.exists(path)
+    mode   = 'a' if append else 'w'
+    if fmt == 'jsonl':
+        with open(path, mode, encoding='utf-8') as f:
+            for rec in data:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    else:
+        with open(path, mode, newline='', encoding='utf-8') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=list(data[0].keys()))
+            if not (append and exists):
+                writer.writeheader()
+            for row in data:
+                writer.writerow(row)
+
+def main(args):
+    setup_logging(args.log)
+    if args.daemon:
+        ScrapeDaemon(args).run()
+        return
+    logging.info("Starting scraper")
+
+    driver  = make_driver(args)
+    stories = load_listing(driver, args)
+    if stories is None:
+        driver.quit()
+        return
+
+    data = []
+    for idx, (title, url, summary) in enumerate(stories, start=1):
+        try:
+            data.append(scrape_article(driver, title, url, summary))
             logging.info(f"Scraped [{idx}]: {title}")
         except Exception as e:
             logging.error(f"Error on article #{idx}: {e}")
+            telemetry.count("article_errors")
 
     driver.quit()
     logging.info(f"Collected {len(data)} total articles")
 
-    # ——— 24-Hour or Custom Date-Range Filter ———
     if args.timestamp and data:
-        # use a timezone-aware “now”
-        now = datetime.now(timezone.utc)
-        # if user passed --start-date, use that; otherwise go back 24h
-        if args.start_date:
-            cutoff = datetime.fromisoformat(
-                args.start_date.replace('Z', '+00:00')
-            )
-        else:
-            cutoff = now - timedelta(hours=24)
-
-        before = len(data)
-        filtered = []
-        for rec in data:
-            ts = rec.get('timestamp')
-            if not ts:
-                continue
-            # parse ISO8601 into UTC-aware datetime
-            dt = datetime.fromisoformat(ts.replace('Z', '+00:00'))
-            if dt >= cutoff:
-                filtered.append(rec)
-        data = filtered
-        logging.info(
-            f"Filtered articles: {len(data)} of {before} "
-            f"kept since {cutoff.isoformat()}Z"
-        )
+        data = filter_recent(data, args)
     elif not args.timestamp:
         logging.warning(
             "Timestamp flag not set; skipping date filter"
@@ -191,18 +280,240 @@ def main(args):
         logging.warning("No articles to write, exiting")
         return
 
-    if args.format == 'jsonl':
-        with open(args.output, 'w', encoding='utf-8') as f:
-            for rec in data:
-                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
-        logging.info(f"Saved {len(data)} articles to {args.output} (JSONL)")
-    else:
-        with open(args.output, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=list(data[0].keys()))
-            writer.writeheader()
-            for row in data:
-                writer.writerow(row)
-        logging.info(f"Saved {len(data)} articles to {args.output} (CSV)")
+    write_records(data, args.output, args.format)
+    logging.info(f"Saved {len(data)} articles to {args.output} ({args.format.upper()})")
+
+# ────────────────────────────────────────────────────────────
+# DAEMON MODE
+# ────────────────────────────────────────────────────────────
+
+class ScrapeDaemon:
+    """
+    Keep one warm browser session and poll the listing every `interval`
+    seconds, fetching only stories not seen before. New articles are
+    appended to <output-dir>/date=YYYY-MM-DD/articles.<fmt>, so output
+    rotates daily and is never overwritten.
+
+    The browser is relaunched after `recycle_pages` page loads, when the
+    resident memory of chromedriver and all its Chrome processes has grown
+    by `recycle_rss_mb` since launch (needs psutil), or as soon as the
+    session dies (the rest of that cycle is left for the next one). Page
+    loads time out after PAGE_TIMEOUT_S. Articles that fail or come
+    back empty DETAIL_RETRIES times are skipped for good. SIGINT/SIGTERM finish the current article, save what
+    the cycle collected and quit the browser.
+    """
+    def __init__(self, args):
+        self.args      = args
+        self.out_dir   = Path(args.output_dir)
+        self.stop      = threading.Event()
+        self.driver    = None
+        self.pages     = 0             # page loads since the browser was launched
+        self.rss_base  = None          # browser RSS after the first listing load, in MB
+        self.cycles    = []            # per-cycle stats, for the shutdown summary
+        self.failures  = {}            # id -> cycles its article failed or came back empty
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.seen      = self._load_seen()
+
+    # ─── state ───────────────────────────────────────────────
+
+    def _load_seen(self) -> set:
+        path = self.out_dir / SEEN_IDS_FILE
+        if not path.exists():
+            return set()
+        return set(path.read_text(encoding="utf-8").split())
+
+    def _mark_seen(self, ids) -> None:
+        self.seen.update(ids)
+        with open(self.out_dir / SEEN_IDS_FILE, "a", encoding="utf-8") as f:
+            f.write("".join(f"{i}\n" for i in ids))
+
+    def _append(self, records) -> int:
+        today = datetime.now(timezone.utc).date().isoformat()
+        by_date = {}
+        for rec in records:
+            ts   = rec.get("timestamp")
+            date = ts[:10] if isinstance(ts, str) and ts[:4].isdigit() else today
+            by_date.setdefault(date, []).append(rec)
+        for date, recs in by_date.items():
+            part = self.out_dir / f"date={date}"
+            part.mkdir(parents=True, exist_ok=True)
+            write_records(recs, str(part / f"articles.{self.args.format}"), self.args.format, append=True)
+        return len(by_date)
+
+    # ─── browser lifecycle ───────────────────────────────────
+
+    def _browser_rss_mb(self) -> float:
+        """RSS of chromedriver plus every Chrome process under it (0 without psutil)."""
+        if psutil is None or self.driver is None:
+            return 0.0
+        try:
+            root  = psutil.Process(self.driver.service.process.pid)
+            procs = [root, *root.children(recursive=True)]
+        except (psutil.Error, AttributeError):
+            return 0.0
+        total = 0
+        for proc in procs:
+            try:
+                total += proc.memory_info().rss
+            except psutil.Error:       # a renderer exited while we were walking the tree
+                pass
+        return total / 2**20
+
+    def _recycle_reason(self):
+        if self.driver is None:
+            return "start"
+        if self.pages >= self.args.recycle_pages:
+            return f"{self.pages} pages"
+        if self.rss_base is not None:
+            growth = self._browser_rss_mb() - self.rss_base
+            if growth >= self.args.recycle_rss_mb:
+                return f"browser RSS grew {growth:.0f} MB"
+        return None
+
+    def _browser_alive(self) -> bool:
+        try:
+            self.driver.window_handles
+            return True
+        except WebDriverException:
+            return False
+
+    def _quit_browser(self) -> None:
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception as e:
+                logging.warning(f"Browser quit failed: {e}")
+        self.driver, self.pages, self.rss_base = None, 0, None
+
+    def _ensure_browser(self) -> None:
+        reason = self._recycle_reason()
+        if reason is None:
+            return
+        if reason != "start":
+            logging.info(f"Recycling browser ({reason})")
+            telemetry.count("browser_recycles")
+        self._quit_browser()
+        self.driver = make_driver(self.args, own_session=True,
+                                  page_load_timeout=PAGE_TIMEOUT_S)
+
+    # ─── polling ─────────────────────────────────────────────
+
+    def run_cycle(self) -> dict:
+        started = time.perf_counter()
+        stats   = {"started": datetime.now(timezone.utc).isoformat(), "new": 0, "saved": 0,
+                   "errors": 0, "article_seconds": []}
+
+        self._ensure_browser()
+        t0 = time.perf_counter()
+        stories = load_listing(self.driver, self.args) or []
+        self.pages += 1
+        stats["listing_seconds"] = time.perf_counter() - t0
+        if self.rss_base is None:
+            self.rss_base = self._browser_rss_mb()
+
+        fresh = [s for s in stories if article_id(s[1]) not in self.seen]
+        stats["listed"], stats["new"] = len(stories), len(fresh)
+
+        data = []
+        for title, url, summary in fresh:
+            if self.stop.is_set():
+                break
+            t0 = time.perf_counter()
+            try:
+                rec = scrape_article(self.driver, title, url, summary)
+                self.pages += 1
+            except Exception as e:
+                stats["errors"] += 1
+                if not self._browser_alive():
+                    # the browser died, not the article: don't charge it a retry,
+                    # and start a fresh browser next cycle
+                    logging.error(f"Browser session lost on {url}: {e}; ending the cycle early")
+                    telemetry.count("browser_crashes")
+                    self._quit_browser()
+                    break
+                logging.error(f"Error on {url}: {e}")
+                telemetry.count("article_errors")
+                self._note_failure(article_id(url), url, "failed attempts")
+                continue
+            stats["article_seconds"].append(time.perf_counter() - t0)
+            if rec["content_full"] or rec["timestamp"]:
+                data.append(rec)
+                logging.info(f"Scraped: {title}")
+                continue
+            stats["errors"] += 1
+            self._note_failure(rec["id"], url, "empty fetches")
+
+        kept = filter_recent(data, self.args) if self.args.timestamp and data else data
+        if kept:
+            stats["partitions"] = self._append(kept)
+        self._mark_seen([r["id"] for r in data])
+        stats["saved"] = len(kept)
+
+        per_article = sorted(stats.pop("article_seconds"))
+        stats["article_p50"] = per_article[len(per_article) // 2] if per_article else 0.0
+        stats["article_max"] = per_article[-1] if per_article else 0.0
+        stats["browser_rss_mb"] = self._browser_rss_mb()
+        stats["pages_since_launch"] = self.pages
+        stats["cycle_seconds"] = time.perf_counter() - started
+        return stats
+
+    def _note_failure(self, key: str, url: str, what: str) -> None:
+        """Retry next cycle, but give up on an article after DETAIL_RETRIES bad cycles."""
+        tries = self.failures[key] = self.failures.get(key, 0) + 1
+        if tries >= DETAIL_RETRIES:
+            logging.warning(f"Giving up on {url} after {tries} {what}")
+            self._mark_seen([key])
+            del self.failures[key]
+
+    def _log_cycle(self, stats: dict) -> None:
+        logging.info(
+            f"Cycle done in {stats['cycle_seconds']:.1f}s: {stats['listed']} listed, "
+            f"{stats['new']} new, {stats['saved']} saved, {stats['errors']} errors; "
+            f"listing {stats['listing_seconds']:.1f}s, article p50 {stats['article_p50']:.1f}s "
+            f"max {stats['article_max']:.1f}s; browser RSS {stats['browser_rss_mb']:.0f} MB"
+        )
+        with open(self.out_dir / CYCLES_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(stats) + "\n")
+
+    def _log_summary(self) -> None:
+        if not self.cycles:
+            return
+        secs = sorted(c["cycle_seconds"] for c in self.cycles)
+        logging.info(
+            f"Daemon stopped after {len(secs)} cycle(s), {sum(c['saved'] for c in self.cycles)} "
+            f"articles saved; cycle p50 {secs[len(secs) // 2]:.1f}s, "
+            f"p95 {secs[min(len(secs) - 1, int(0.95 * len(secs)))]:.1f}s, max {secs[-1]:.1f}s"
+        )
+
+    def _on_signal(self, signum, frame) -> None:
+        logging.info(f"Received signal {signum}, finishing the current article and shutting down")
+        self.stop.set()
+
+    def run(self) -> None:
+        signal.signal(signal.SIGINT, self._on_signal)
+        signal.signal(signal.SIGTERM, self._on_signal)
+        logging.info(f"Starting scrape daemon: every {self.args.interval}s into {self.out_dir}/ "
+                     f"({len(self.seen)} articles already seen)")
+        if psutil is None:
+            logging.warning("psutil not installed: browser memory won't trigger a recycle")
+        try:
+            while not self.stop.is_set():
+                cycle_start = time.monotonic()
+                try:
+                    with telemetry.span("scrape.cycle"):
+                        stats = self.run_cycle()
+                    self.cycles.append(stats)
+                    self._log_cycle(stats)
+                except Exception as e:
+                    # most often a crashed or hung browser: start a fresh one next cycle
+                    logging.exception(f"Cycle failed: {e}")
+                    self._quit_browser()
+                telemetry.flush()
+                # sleep until the next slot, waking early on shutdown
+                self.stop.wait(max(0.0, self.args.interval - (time.monotonic() - cycle_start)))
+        finally:
+            self._quit_browser()
+            self._log_summary()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Enhanced Yahoo Finance News Scraper")
@@ -219,5 +530,13 @@ if __name__ == "__main__":
     parser.add_argument("--format", choices=['csv','jsonl'], default='csv',
                         help="Output format: csv or jsonl")
     parser.add_argument("--debug", action="store_true", help="Disable headless mode")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Keep running, polling the listing every --interval seconds")
+    parser.add_argument("--interval", type=float, default=1800, help="Seconds between polls in daemon mode")
+    parser.add_argument("--output-dir", default="scraped", help="Daemon mode: date-partitioned output folder")
+    parser.add_argument("--recycle-pages", type=int, default=RECYCLE_PAGES,
+                        help="Daemon mode: relaunch the browser after this many page loads")
+    parser.add_argument("--recycle-rss-mb", type=float, default=RECYCLE_RSS_MB,
+                        help="Daemon mode: relaunch when the browser's RSS grows this much (needs psutil)")
     args = parser.parse_args()
     main(args)
@@ -0,0 +1,241 @@
+"""
+sentiment_store.py
+
+Append-only history of classified articles plus per-ticker daily
+aggregates that are rolled forward from each run's new rows only.
+
+Layout under STORE_DIR:
+  articles/date=YYYY-MM-DD/part-<run>.jsonl   classified articles, never rewritten
+  seen_ids.txt                                ids already stored, incl. dedup copies (dedup across runs)
+  daily_aggregates.csv                        one row per (ticker, date)
+  pending_commit.json                         only while a run is committing
+
+Each run writes its partitions and aggregates to temp files, then records
+the renames and new ids in pending_commit.json before applying them. A run
+that crashes part-way is either invisible (no journal yet; its temp files
+are swept) or finished by the next run (journal replayed), so articles are
+never stored or counted twice.
+
+Aggregate columns:
+  articles, score_sum, buy, avoid, neutral    additive counters
+  mean_score        score_sum / articles (signed FinBERT score, -1..1)
+  buy_avoid_ratio   buy / (buy + avoid), share of directional calls that are "buy"
+  *_7d              the same over the trailing 7 calendar days
+
+Articles without a ticker still count toward the market-wide MARKET_TICKER row.
+"""
+
+import json
+import os
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+import pandas as pd
+
+# ────────────────────────────────────────────────────────────
+# CONFIGURATION
+# ────────────────────────────────────────────────────────────
+
+STORE_DIR        = "sentiment_store"
+AGGREGATES_FILE  = "daily_aggregates.csv"
+SEEN_IDS_FILE    = "seen_ids.txt"
+PENDING_FILE     = "pending_commit.json"
+MARKET_TICKER    = "*"       # every article, regardless of ticker
+ROLLING_DAYS     = 7
+
+_COUNTERS = ["articles", "score_sum", "buy", "avoid", "neutral"]
+_COLUMNS  = (["ticker", "date"] + _COUNTERS +
+             ["mean_score", "buy_avoid_ratio",
+              f"articles_{ROLLING_DAYS}d", f"mean_score_{ROLLING_DAYS}d",
+              f"buy_avoid_ratio_{ROLLING_DAYS}d"])
+
+# ────────────────────────────────────────────────────────────
+# HELPERS
+# ────────────────────────────────────────────────────────────
+
+def _article_id(rec: Dict[str, Any]) -> str:
+    return str(rec.get("id") or rec.get("url") or "")
+
+def _member_ids(rec: Dict[str, Any]) -> List[str]:
+    """The record's id plus the ids of the copies dedup folded into it."""
+    dupes = rec.get("duplicates")
+    if isinstance(dupes, str):
+        try:
+            dupes = json.loads(dupes)
+        except ValueError:
+            dupes = []
+    members = [rec, *(d for d in dupes if isinstance(d, dict))] if isinstance(dupes, list) else [rec]
+    return [key for key in map(_article_id, members) if key]
+
+def _article_date(rec: Dict[str, Any], fallback: str) -> str:
+    ts = rec.get("timestamp")
+    if isinstance(ts, str) and ts:
+        try:
+            return datetime.fromisoformat(ts.replace("Z", "+00:00")).date().isoformat()
+        except ValueError:
+            pass
+    return fallback
+
+def _article_tickers(rec: Dict[str, Any]) -> List[str]:
+    tickers = rec.get("tickers")
+    if isinstance(tickers, str):
+        try:
+            tickers = json.loads(tickers)
+        except ValueError:
+            tickers = []
+    if not isinstance(tickers, list) or not tickers:
+        single  = rec.get("ticker")
+        tickers = [single] if isinstance(single, str) and single else []
+    return [MARKET_TICKER, *tickers]
+
+def _derive(df: pd.DataFrame) -> pd.DataFrame:
+    """Fill ratio and trailing-window columns for one ticker's daily rows."""
+    df = df.sort_values("date").reset_index(drop=True)
+    directional = df["buy"] + df["avoid"]
+    df["mean_score"]      = df["score_sum"] / df["articles"]
+    df["buy_avoid_ratio"] = (df["buy"] / directional).where(directional > 0, 0.5)
+
+    # time-based window so missing days count as zero, not as "the previous row"
+    daily  = df.set_index(pd.to_datetime(df["date"]))[_COUNTERS]
+    window = daily.rolling(f"{ROLLING_DAYS}D").sum()
+    roll_dir = window["buy"] + window["avoid"]
+    df[f"articles_{ROLLING_DAYS}d"]        = window["articles"].to_numpy()
+    df[f"mean_score_{ROLLING_DAYS}d"]      = (window["score_sum"] / window["articles"]).to_numpy()
+    df[f"buy_avoid_ratio_{ROLLING_DAYS}d"] = ((window["buy"] / roll_dir)
+                                              .where(roll_dir > 0, 0.5).to_numpy())
+    return df
+
+# ────────────────────────────────────────────────────────────
+# WRITE PATH
+# ────────────────────────────────────────────────────────────
+
+def _finish_commit(store: Path) -> None:
+    """
+    Apply a journaled run's renames and seen-id append, then drop the
+    journal. Safe to repeat: renames of already-moved files are skipped
+    and seen_ids.txt is read as a set. Temp files of runs that never got
+    as far as the journal are deleted.
+    """
+    journal = store / PENDING_FILE
+    if journal.exists():
+        pending = json.loads(journal.read_text(encoding="utf-8"))
+        for tmp, final in pending["renames"]:
+            if (store / tmp).exists():
+                os.replace(store / tmp, store / final)
+        with open(store / SEEN_IDS_FILE, "a", encoding="utf-8") as f:
+            f.write("".join(f"{key}\n" for key in pending["ids"]))
+            f.flush()
+            os.fsync(f.fileno())
+        journal.unlink()
+    for orphan in [*store.glob("articles/date=*/*.tmp"), *store.glob("*.tmp")]:
+        orphan.unlink()
+
+def load_seen_ids(store_dir: str = STORE_DIR) -> set:
+    path = Path(store_dir) / SEEN_IDS_FILE
+    if not path.exists():
+        return set()
+    return set(path.read_text(encoding="utf-8").split())
+
+def append_articles(records: Iterable[Dict[str, Any]], store_dir: str = STORE_DIR) -> Dict[str, Any]:
+    """
+    Store the classified records not seen in earlier runs and fold only
+    those into the daily aggregates. Needs `classification` and
+    `sentiment_score` on every record. Returns a small run report.
+    """
+    store = Path(store_dir)
+    store.mkdir(parents=True, exist_ok=True)
+    _finish_commit(store)
+    seen  = load_seen_ids(store_dir)
+    now   = datetime.now(timezone.utc)
+    today = now.date().isoformat()
+
+    # a story is known if any copy of it was stored before: dedup may pick a
+    # different (longer) copy as canonical when the story is scraped again
+    new, batch_ids, also_seen = [], set(), set()
+    for rec in records:
+        keys = _member_ids(rec)
+        if not keys:
+            continue
+        if any(k in seen or k in batch_ids for k in keys):
+            # remember this run's new copies too, so they can't come back on their own later
+            also_seen.update(k for k in keys if k not in seen)
+        else:
+            new.append(rec)
+            batch_ids.update(keys)
+    also_seen -= batch_ids
+    if not new:
+        if also_seen:
+            with open(store / SEEN_IDS_FILE, "a", encoding="utf-8") as f:
+                f.write("".join(f"{key}\n" for key in sorted(also_seen)))
+        return {"new_articles": 0, "partitions": 0, "tickers_updated": 0}
+
+    # 1) append-only, date-partitioned article files, written under temp names
+    by_date: Dict[str, List[Dict[str, Any]]] = {}
+    for rec in new:
+        by_date.setdefault(_article_date(rec, today), []).append(rec)
+    run_id  = f"{now.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:12]}"
+    renames = []
+    for date, recs in by_date.items():
+        part_dir = store / "articles" / f"date={date}"
+        part_dir.mkdir(parents=True, exist_ok=True)
+        final = part_dir / f"part-{run_id}.jsonl"
+        tmp   = final.with_name(final.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for rec in recs:
+                f.write(json.dumps(rec, ensure_ascii=False, default=str) + "\n")
+        renames.append((str(tmp.relative_to(store)), str(final.relative_to(store))))
+
+    # 2) per-(ticker, day) deltas from the new rows only
+    deltas: Dict[Tuple[str, str], Dict[str, float]] = {}
+    for rec in new:
+        date  = _article_date(rec, today)
+        label = rec.get("classification")
+        score = float(rec.get("sentiment_score") or 0.0)
+        for ticker in _article_tickers(rec):
+            d = deltas.setdefault((ticker, date), dict.fromkeys(_COUNTERS, 0.0))
+            d["articles"]  += 1
+            d["score_sum"] += score
+            d["buy"]       += label == "best_to_buy"
+            d["avoid"]     += label == "best_to_avoid"
+            d["neutral"]   += label not in ("best_to_buy", "best_to_avoid")
+    delta_df = pd.DataFrame([{"ticker": t, "date": d, **v} for (t, d), v in deltas.items()])
+
+    # 3) merge into the materialized aggregates, recomputing windows only for touched tickers
+    current  = load_aggregates(store_dir)
+    touched  = set(delta_df["ticker"])
+    untouched = current[~current["ticker"].isin(touched)]
+    existing  = current[current["ticker"].isin(touched)][["ticker", "date"] + _COUNTERS]
+    merged = ((pd.concat([existing, delta_df]) if len(existing) else delta_df)
+              .astype(dict.fromkeys(_COUNTERS, float))
+              .groupby(["ticker", "date"], as_index=False)[_COUNTERS].sum())
+    updated = pd.concat([_derive(g) for _, g in merged.groupby("ticker")], ignore_index=True)
+    combined = pd.concat([untouched, updated], ignore_index=True) if len(untouched) else updated
+    agg_tmp  = AGGREGATES_FILE + ".tmp"
+    combined[_COLUMNS].sort_values(["ticker", "date"]).to_csv(store / agg_tmp, index=False)
+    renames.append((agg_tmp, AGGREGATES_FILE))
+
+    # 4) commit point: once the journal is in place the run counts as stored,
+    #    and _finish_commit (now, or on the next run after a crash) publishes it
+    journal_tmp = store / (PENDING_FILE + ".tmp")
+    journal_tmp.write_text(json.dumps({"renames": renames,
+                                       "ids": sorted(batch_ids | also_seen)}), encoding="utf-8")
+    os.replace(journal_tmp, store / PENDING_FILE)
+    _finish_commit(store)
+
+    return {"new_articles": len(new), "partitions": len(by_date), "tickers_updated": len(touched)}
+
+def format_store_report(report: Dict[str, Any]) -> str:
+    return (f"Sentiment store: +{report['new_articles']} new articles across "
+            f"{report['partitions']} day partition(s); {report['tickers_updated']} ticker series updated")
+
+# ────────────────────────────────────────────────────────────
+# READ PATH
+# ────────────────────────────────────────────────────────────
+
+def load_aggregates(store_dir: str = STORE_DIR) -> pd.DataFrame:
+    path = Path(store_dir) / AGGREGATES_FILE
+    if not path.exists():
+        return pd.DataFrame(columns=_COLUMNS)
+    return pd.read_csv(path, dtype={"ticker": str, "date": str}, keep_default_na=False)
@@ -1,7 +1,19 @@
+import argparse
+import csv
+import hashlib
+import json
 import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import numpy as np
 import torch
 from transformers import pipeline, AutoTokenizer, AutoModelForSeq2SeqLM
 
+import telemetry
+
 # ────────────────────────────────────────────────────────────
 # CONFIGURATION
 # ────────────────────────────────────────────────────────────
@@ -10,37 +22,66 @@ MODEL_NAME        = "facebook/bart-large-cnn"
 MAX_CHUNK_TOKENS  = 512    # max tokens per chunk
 DEFAULT_MAX_SUM   = 128    # default summary length
 DEFAULT_MIN_SUM   = 30     # default minimum summary length
+SUMMARIES_FILE    = "summaries.jsonl"
+SUMMARIZE_CLASSES = ("best_to_buy", "best_to_avoid")   # what the dashboard shows
+
+SUMMARY_MODES       = ("abstractive", "extractive", "auto")
+WORDS_PER_TOKEN     = 0.75   # rough English words per BART token, for length budgets
+AUTO_LATENCY_BUDGET = 1.0    # seconds mode="auto" may spend before going extractive
+LEXRANK_DAMPING     = 0.85
+LEXRANK_ITERATIONS  = 30
+MIN_SENTENCE_WORDS  = 4      # shorter fragments ("Read more.") are never picked
+
+# starting guesses for mode="auto", replaced by calibrate() and by measured
+# timings as BART runs
+_chunk_seconds      = {"cuda": 0.5, "cpu": 4.0}
 
 # ────────────────────────────────────────────────────────────
-# INITIALIZE: tokenizer + model + pipeline
+# INITIALIZE: tokenizer + model + pipeline (on first use)
 # ────────────────────────────────────────────────────────────
 
 device = "cuda" if torch.cuda.is_available() else "cpu"
-print(f"Loading `{MODEL_NAME}` on {device} ...")
 
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+# loaded lazily so importing this module (pipeline, benchmarks) stays cheap;
+# benchmarks may also assign stand-ins to these before first use
+tokenizer   = None
+_summarizer = None
 
-if device == "cuda":
-    model = AutoModelForSeq2SeqLM.from_pretrained(
-        MODEL_NAME,
-        torch_dtype=torch.float16,
-        device_map="auto",
+def _get_tokenizer():
+    global tokenizer
+    if tokenizer is None:
+        tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    return tokenizer
+
+def _get_summarizer():
+    global _summarizer
+    if _summarizer is not None:
+        return _summarizer
+
+    print(f"Loading `{MODEL_NAME}` on {device} ...")
+    with telemetry.span("summarize.model_load", device=device):
+        if device == "cuda":
+            model = AutoModelForSeq2SeqLM.from_pretrained(
+                MODEL_NAME,
+                torch_dtype=torch.float16,
+                device_map="auto",
+            )
+            pipe_device = 0
+        else:
+            model = AutoModelForSeq2SeqLM.from_pretrained(MODEL_NAME)
+            pipe_device = -1
+
+    # give the pipeline a default max_length so truncation has something to work against
+    _summarizer = pipeline(
+        "summarization",
+        model=model,
+        tokenizer=_get_tokenizer(),
+        device=pipe_device,
+        truncation=True,
+        max_length=DEFAULT_MAX_SUM,    # <-- default truncate length
+        min_length=DEFAULT_MIN_SUM,    # <-- default minimum length
     )
-    pipe_device = 0
-else:
-    model = AutoModelForSeq2SeqLM.from_pretrained(MODEL_NAME)
-    pipe_device = -1
-
-# give the pipeline a default max_length so truncation has something to work against
-_summarizer = pipeline(
-    "summarization",
-    model=model,
-    tokenizer=tokenizer,
-    device=pipe_device,
-    truncation=True,
-    max_length=DEFAULT_MAX_SUM,    # <-- default truncate length
-    min_length=DEFAULT_MIN_SUM,    # <-- default minimum length
-)
+    return _summarizer
 
 
 # ────────────────────────────────────────────────────────────
@@ -51,11 +92,12 @@ def _chunk_text(text: str, max_tokens: int = MAX_CHUNK_TOKENS) -> list[str]:
     """
     Naively split on sentence boundaries into chunks of <= max_tokens.
     """
+    tok   = _get_tokenizer()
     sents = re.split(r'(?<=[\.\!\?]) +', text)
     chunks, current, curr_len = [], [], 0
 
     for sent in sents:
-        length = len(tokenizer.tokenize(sent))
+        length = len(tok.tokenize(sent))
         if curr_len + length > max_tokens:
             if current:
                 chunks.append(" ".join(current))
@@ -70,32 +112,221 @@ def _chunk_text(text: str, max_tokens: int = MAX_CHUNK_TOKENS) -> list[str]:
 
     return chunks
 
-def summarize(text: str,
-              max_length: int = DEFAULT_MAX_SUM,
-              min_length: int = DEFAULT_MIN_SUM) -> str:
+_SENTENCE_RE = re.compile(r'(?<=[\.\!\?])\s+|\n{2,}')
+_WORD_RE     = re.compile(r"[a-z0-9]+")
+
+def _split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_RE.split(text) if s and s.strip()]
+
+def _tfidf_matrix(sents: List[str]) -> np.ndarray:
+    """L2-normalized TF-IDF rows, one per sentence."""
+    vocab: dict = {}
+    rows, cols = [], []
+    for i, sent in enumerate(sents):
+        for word in _WORD_RE.findall(sent.lower()):
+            rows.append(i)
+            cols.append(vocab.setdefault(word, len(vocab)))
+    tf = np.zeros((len(sents), max(len(vocab), 1)), dtype=np.float32)
+    np.add.at(tf, (rows, cols), 1.0)
+    df  = np.count_nonzero(tf, axis=0)
+    idf = np.log((1 + len(sents)) / (1 + df)) + 1.0
+    x   = tf * idf.astype(np.float32)
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return x / np.where(norms > 0, norms, 1.0)
+
+def _centrality(vectors: np.ndarray) -> np.ndarray:
     """
-    Summarize the text, automatically chunking long inputs.
-    Returns a single string with each chunk's summary joined by blank lines.
+    Continuous LexRank: PageRank over the sentence cosine-similarity graph,
+    so sentences similar to many other central sentences score highest.
     """
-    if not text:
-        return ""
+    sim = np.clip(vectors @ vectors.T, 0.0, None)
+    np.fill_diagonal(sim, 0.0)
+    out_weight = sim.sum(axis=1, keepdims=True)
+    n = len(sim)
+    # isolated sentences spread their weight evenly instead of leaking it
+    trans = np.where(out_weight > 0, sim / np.where(out_weight > 0, out_weight, 1.0), 1.0 / n)
+    rank  = np.full(n, 1.0 / n)
+    for _ in range(LEXRANK_ITERATIONS):
+        updated = (1 - LEXRANK_DAMPING) / n + LEXRANK_DAMPING * (trans.T @ rank)
+        if np.abs(updated - rank).sum() < 1e-6:
+            return updated
+        rank = updated
+    return rank
 
-    chunks    = _chunk_text(text)
-    summaries = []
+def summarize_extractive(text: str,
+                         max_length: int = DEFAULT_MAX_SUM,
+                         embed: Optional[Callable[[List[str]], "np.ndarray"]] = None) -> str:
+    """
+    Pick the most central sentences, in their original order, within
+    about `max_length` tokens. Sentences are compared by TF-IDF, or by
+    `embed(sentences)` vectors (e.g. MiniLM's embed_documents) when given.
+    """
+    sents = _split_sentences(text)
+    if len(sents) <= 1:
+        return text.strip()
+
+    with telemetry.span("summarize.extractive", sentences=len(sents)):
+        if embed is not None:
+            vectors = np.asarray(embed(sents), dtype=np.float32)
+            norms   = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms > 0, norms, 1.0)
+        else:
+            vectors = _tfidf_matrix(sents)
+        scores = _centrality(vectors)
+
+        budget  = max(1, int(max_length * WORDS_PER_TOKEN))
+        lengths = [len(s.split()) for s in sents]
+        picked, used = [], 0
+        for i in np.argsort(-scores, kind="stable"):
+            if lengths[i] < MIN_SENTENCE_WORDS or (picked and used + lengths[i] > budget):
+                continue
+            picked.append(i)
+            used += lengths[i]
+            if used >= budget:
+                break
+    return " ".join(sents[i] for i in sorted(picked)) or sents[0]
+
+def _summarize_abstractive(text: str, max_length: int, min_length: int) -> str:
+    chunks     = _chunk_text(text)
+    summarizer = _get_summarizer()
+    summaries  = []
 
     for chunk in chunks:
-        tok_count  = len(tokenizer.tokenize(chunk))
+        tok_count  = len(_get_tokenizer().tokenize(chunk))
         # never ask for more than half your input length
         clamp_max  = min(max_length, tok_count // 2) or 1
         clamp_min  = min(min_length, clamp_max // 2) or 1
 
-        out = _summarizer(
-            chunk,
-            max_length=clamp_max,
-            min_length=clamp_min,
-            do_sample=False,
-            truncation=True,
-        )
+        started = time.perf_counter()
+        with telemetry.span("summarize.chunk", input_tokens=tok_count):
+            out = summarizer(
+                chunk,
+                max_length=clamp_max,
+                min_length=clamp_min,
+                do_sample=False,
+                truncation=True,
+            )
+        # moving average of real chunk latency, used by mode="auto"
+        _chunk_seconds[device] = 0.7 * _chunk_seconds[device] + 0.3 * (time.perf_counter() - started)
         summaries.append(out[0]["summary_text"].strip())
+        if telemetry.enabled:
+            telemetry.count("tokens_generated", len(_get_tokenizer().tokenize(summaries[-1])))
 
     return "\n\n".join(summaries)
+
+def estimate_abstractive_seconds(text: str) -> float:
+    """
+    Rough per-request BART latency for `text`. The one-time model load is
+    left out: it is paid once per process, not by every story.
+    """
+    chunk_words = MAX_CHUNK_TOKENS * WORDS_PER_TOKEN
+    n_chunks    = max(1, int(np.ceil(len(text.split()) / chunk_words)))
+    return n_chunks * _chunk_seconds[device]
+
+def calibrate(sample: str) -> float:
+    """
+    Load BART and time one chunk of `sample`, replacing the starting guess
+    that mode="auto" works from with a measured per-chunk latency.
+    """
+    _get_summarizer()
+    chunk   = _chunk_text(sample)[0]
+    started = time.perf_counter()
+    with telemetry.span("summarize.calibrate"):
+        _summarize_abstractive(chunk, DEFAULT_MAX_SUM, DEFAULT_MIN_SUM)
+    _chunk_seconds[device] = time.perf_counter() - started
+    return _chunk_seconds[device]
+
+def resolve_mode(text: str, mode: str, latency_budget: float = AUTO_LATENCY_BUDGET) -> str:
+    """The concrete mode ("abstractive" or "extractive") `summarize` will use."""
+    if mode not in SUMMARY_MODES:
+        raise ValueError(f"mode must be one of {SUMMARY_MODES}, got {mode!r}")
+    if mode != "auto":
+        return mode
+    return "abstractive" if estimate_abstractive_seconds(text) <= latency_budget else "extractive"
+
+def summarize(text: str,
+              max_length: int = DEFAULT_MAX_SUM,
+              min_length: int = DEFAULT_MIN_SUM,
+              mode: str = "abstractive",
+              latency_budget: float = AUTO_LATENCY_BUDGET,
+              embed: Optional[Callable[[List[str]], "np.ndarray"]] = None) -> str:
+    """
+    Summarize the text, automatically chunking long inputs.
+
+    mode="abstractive"  BART; each chunk's summary joined by blank lines
+    mode="extractive"   the most central sentences, in milliseconds
+    mode="auto"         abstractive if its estimated latency fits in
+                        `latency_budget` seconds, extractive otherwise
+    """
+    mode = resolve_mode(text, mode, latency_budget)
+    if not text:
+        return ""
+    telemetry.count(f"summaries_{mode}")
+
+    if mode == "extractive":
+        return summarize_extractive(text, max_length, embed=embed)
+    return _summarize_abstractive(text, max_length, min_length)
+
+
+# ────────────────────────────────────────────────────────────
+# BATCH: summarize the dashboard's stories
+# ────────────────────────────────────────────────────────────
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def main(args):
+    """
+    Summarize every buy/avoid story in the classified CSV into a JSONL of
+    {id, text_sha1, mode, summary}, where mode is the one actually used.
+    Stories whose text and mode haven't changed since the last run reuse
+    their previous summary; with --mode auto either mode's summary counts,
+    abstractive preferred, and BART is timed once before the first miss.
+    """
+    previous = {}
+    if Path(args.output).exists():
+        with open(args.output, encoding="utf-8") as f:
+            for line in f:
+                rec = json.loads(line)
+                previous[(rec["id"], rec["text_sha1"], rec.get("mode", "abstractive"))] = rec["summary"]
+
+    # full article bodies exceed csv's 128 KB default; the C long is 32-bit on Windows
+    csv.field_size_limit(min(sys.maxsize, 2**31 - 1))
+    with open(args.input, newline="", encoding="utf-8") as f:
+        rows = [r for r in csv.DictReader(f) if r.get("classification") in SUMMARIZE_CLASSES]
+
+    out, reused, calibrated = [], 0, False
+    for row in rows:
+        text  = row.get("content_full") or row.get("summary") or ""
+        story = (row.get("id") or row.get("url"), _text_hash(text))
+        modes = ("abstractive", "extractive") if args.mode == "auto" else (args.mode,)
+        mode  = next((m for m in modes if (*story, m) in previous), None)
+        if mode is not None:
+            reused += 1
+            summary = previous[(*story, mode)]
+            telemetry.count("summary_cache_hits")
+        else:
+            if args.mode == "auto" and not calibrated and text:
+                print(f"Calibrating auto mode: {calibrate(text):.2f}s per BART chunk on {device}")
+                calibrated = True
+            mode = resolve_mode(text, args.mode, args.latency_budget)
+            with telemetry.span("summarize.story", chars=len(text)):
+                summary = summarize(text, mode=mode)
+            telemetry.count("summary_cache_misses")
+        out.append({"id": story[0], "text_sha1": story[1], "mode": mode, "summary": summary})
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        for rec in out:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    print(f"Summarized {len(out) - reused} stories, reused {reused} cached summaries -> {args.output}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize the dashboard's buy/avoid stories")
+    parser.add_argument("--input", default="sentiment.csv", help="Classified CSV from dataPrep.py")
+    parser.add_argument("--output", default=SUMMARIES_FILE, help="JSONL of generated summaries")
+    parser.add_argument("--mode", choices=SUMMARY_MODES, default="abstractive",
+                        help="BART, fast extractive sentence ranking, or auto by latency budget")
+    parser.add_argument("--latency-budget", type=float, default=AUTO_LATENCY_BUDGET,
+                        help="Seconds per story mode=auto may spend on BART")
+    args = parser.parse_args()
+    main(args)
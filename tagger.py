@@ -0,0 +1,277 @@
+"""
+tagger.py
+
+Tag articles with every ticker they mention, using a local symbol /
+company-name dictionary (symbols.csv) instead of the single "(TICKER)"
+regex on the title.
+
+Company names and aliases are compiled into a word-level Aho-Corasick
+automaton, so one pass over an article's tokens finds every name at once.
+The pass is linear in the article length and does not depend on how many
+symbols the dictionary holds. Bare tickers are a single-token dictionary
+lookup. Tickers shorter than MIN_BARE_TICKER ("A", "IT") only count
+when written as "$IT" or "(IT)".
+
+Names match case-sensitively where the dictionary capitalizes them, so
+"new visa rules" or "citi bike" tag nothing.
+
+Which words are ambiguous is data, not code: the optional `ambiguous`
+column lists a symbol's forms that are also everyday words or people's
+names. A ticker listed there ("NOW", "CAT") needs the "$"/"(" marker;
+a name listed there ("Ford", "Visa") only counts when the same article
+mentions that company some other way (its ticker or another name), so
+"Harrison Ford" alone doesn't tag F.
+
+Dictionary format (CSV with header; `aliases` and `ambiguous` are "|"-separated):
+  symbol,name,aliases,ambiguous
+  AAPL,Apple Inc.,Apple|iPhone maker,
+  F,Ford Motor Company,Ford,Ford
+  CAT,Caterpillar Inc.,Caterpillar,CAT
+
+Usage:
+  python tagger.py --input selenium_yahoo_finance.jsonl --output articles_tagged.jsonl
+  python tagger.py --input articles.parquet --output articles_tagged.parquet
+"""
+
+import argparse
+import csv
+import json
+import re
+from collections import Counter, deque
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+# ────────────────────────────────────────────────────────────
+# CONFIGURATION
+# ────────────────────────────────────────────────────────────
+
+SYMBOLS_FILE     = "symbols.csv"
+MIN_BARE_TICKER  = 3      # shorter tickers need a "$" or "(" marker
+_TOKEN_RE        = re.compile(r"[A-Za-z0-9]+(?:[&.\-][A-Za-z0-9]+)*")
+_NAME_SUFFIXES   = {"inc", "inc.", "corp", "corp.", "corporation", "co", "co.", "company",
+                    "ltd", "ltd.", "plc", "sa", "ag", "nv", "n.v", "holdings", "group", "the", "and"}
+
+def _tokens(text: str) -> List[Tuple[str, int]]:
+    """(token, start_offset) pairs, case preserved."""
+    return [(m.group(), m.start()) for m in _TOKEN_RE.finditer(text or "")]
+
+def _name_variants(name: str) -> List[Tuple[str, ...]]:
+    """
+    Token tuples for a company name, case preserved, with and without
+    legal suffixes ("Apple Inc." -> ("Apple", "Inc"), ("Apple",)).
+    """
+    words = tuple(t for t, _ in _tokens(name))
+    variants = {words}
+    stripped = list(words)
+    while stripped and stripped[-1].lower() in _NAME_SUFFIXES:
+        stripped.pop()
+    while stripped and stripped[0].lower() == "the":
+        stripped.pop(0)
+    if stripped and (len(stripped) > 1 or len(stripped[0]) >= 3):
+        variants.add(tuple(stripped))
+    return [v for v in variants if v]
+
+def _same_case(token: str, word: str) -> bool:
+    """A capitalized dictionary word ("Visa") only matches capitalized text ("Visa", "VISA")."""
+    if token.lower() != word.lower():
+        return False
+    return not word[:1].isupper() or token[:1].isupper()
+
+# ────────────────────────────────────────────────────────────
+# AHO-CORASICK OVER WORDS
+# ────────────────────────────────────────────────────────────
+
+class _WordAutomaton:
+    """
+    Aho-Corasick automaton whose alphabet is words, not characters.
+    Each pattern is a tuple of lowercase words mapped to a symbol.
+    """
+    def __init__(self):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out:  List[List[Tuple[int, str]]] = [[]]   # (pattern length, symbol)
+
+    def add(self, words: Tuple[str, ...], symbol: str) -> None:
+        node = 0
+        for w in words:
+            nxt = self.goto[node].get(w)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][w] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            node = nxt
+        if (len(words), symbol) not in self.out[node]:
+            self.out[node].append((len(words), symbol))
+
+    def build(self) -> None:
+        """Breadth-first pass wiring failure links and merged outputs."""
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for w, child in self.goto[node].items():
+                queue.append(child)
+                f = self.fail[node]
+                while f and w not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(w, 0)
+                self.fail[child] = target if target != child else 0
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+
+    def scan(self, words: List[str]) -> List[Tuple[int, int, str]]:
+        """All (start, end, symbol) matches, end exclusive, in word positions."""
+        goto, fail, out = self.goto, self.fail, self.out
+        node, hits = 0, []
+        for i, w in enumerate(words):
+            while node and w not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(w, 0)
+            for length, symbol in out[node]:
+                hits.append((i + 1 - length, i + 1, symbol))
+        return hits
+
+# ────────────────────────────────────────────────────────────
+# TAGGER
+# ────────────────────────────────────────────────────────────
+
+class SymbolTagger:
+    """
+    Built from (symbol, name, aliases, ambiguous) entries; `ambiguous`
+    lists the symbol's forms (the ticker itself or names) that need
+    corroboration, see the module docstring.
+    """
+    def __init__(self, entries: Iterable[Tuple[str, str, List[str], List[str]]]):
+        self.names   = _WordAutomaton()
+        self.symbols = set()
+        self.ambiguous_tickers = set()
+        self.ambiguous_names: set = set()       # (lowercase words, symbol)
+        # (lowercase words, symbol) -> the cased spellings the dictionary gave
+        self.spellings: Dict[Tuple[Tuple[str, ...], str], set] = {}
+        for symbol, name, aliases, ambiguous in entries:
+            symbol = symbol.strip().upper()
+            if not symbol:
+                continue
+            self.symbols.add(symbol)
+            for label in [name, *aliases]:
+                for variant in _name_variants(label):
+                    lowered = tuple(w.lower() for w in variant)
+                    self.names.add(lowered, symbol)
+                    self.spellings.setdefault((lowered, symbol), set()).add(variant)
+            for label in ambiguous:
+                if label.strip().upper() == symbol:
+                    self.ambiguous_tickers.add(symbol)
+                else:
+                    self.ambiguous_names.add((tuple(t.lower() for t, _ in _tokens(label)), symbol))
+        self.names.build()
+
+    @classmethod
+    def from_csv(cls, path: str = SYMBOLS_FILE) -> "SymbolTagger":
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        return cls(
+            (row["symbol"], row.get("name") or "",
+             [a for a in (row.get("aliases") or "").split("|") if a.strip()],
+             [a for a in (row.get("ambiguous") or "").split("|") if a.strip()])
+            for row in rows
+        )
+
+    def _ticker_positions(self, text: str, tokens: List[Tuple[str, int]]) -> List[int]:
+        """Indices of tokens that count as explicit ticker mentions."""
+        positions = []
+        for i, (tok, start) in enumerate(tokens):
+            if tok not in self.symbols:
+                continue
+            marked = start > 0 and text[start - 1] in "$("
+            if marked or (len(tok) >= MIN_BARE_TICKER and tok not in self.ambiguous_tickers):
+                positions.append(i)
+        return positions
+
+    def tag(self, text: str) -> Counter:
+        """Mention counts per ticker for one piece of text."""
+        tokens  = _tokens(text)
+        tickers = self._ticker_positions(text, tokens)
+        counts  = Counter(tokens[i][0] for i in tickers)
+
+        # leftmost-longest, non-overlapping name matches so "Bank of America"
+        # isn't also counted as "America", and an alias equal to the ticker
+        # ("AMD") isn't counted on top of the ticker mention itself
+        words = [t for t, _ in tokens]
+        lower = [w.lower() for w in words]
+        hits  = sorted(self.names.scan(lower), key=lambda h: (h[0], h[0] - h[1]))
+        taken   = set(tickers)
+        covered = 0
+        pending = Counter()    # ambiguous names, counted only if corroborated
+        for start, end, symbol in hits:
+            if start < covered or (end - start == 1 and start in taken):
+                continue
+            key = (tuple(lower[start:end]), symbol)
+            if not any(all(map(_same_case, words[start:end], sp)) for sp in self.spellings[key]):
+                continue
+            if key in self.ambiguous_names:
+                pending[symbol] += 1
+            else:
+                counts[symbol] += 1
+            covered = end
+        for symbol, n in pending.items():
+            if symbol in counts:
+                counts[symbol] += n
+        return counts
+
+    def tag_record(self, rec: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Add `tickers` (most-mentioned first) and `ticker_mentions`, a list
+        of {"symbol", "count"} records in the same order, to a record; fill
+        `ticker` from the top mention when the scraper found none. (A list
+        of records keeps one fixed Parquet schema, unlike a symbol -> count
+        dict, which pyarrow turns into a struct with a field per symbol.)
+        """
+        title   = rec.get("title") if isinstance(rec.get("title"), str) else ""
+        content = rec.get("content_full") if isinstance(rec.get("content_full"), str) else ""
+        counts  = self.tag(f"{title}\n{content}")
+
+        ranked = [sym for sym, _ in counts.most_common()]
+        rec["tickers"]         = ranked
+        rec["ticker_mentions"] = [{"symbol": sym, "count": n} for sym, n in counts.most_common()]
+        if ranked and not (isinstance(rec.get("ticker"), str) and rec["ticker"]):
+            rec["ticker"] = ranked[0]
+        return rec
+
+def tag_records(records: List[Dict[str, Any]], tagger: SymbolTagger) -> List[Dict[str, Any]]:
+    return [tagger.tag_record(rec) for rec in records]
+
+# ────────────────────────────────────────────────────────────
+# BATCH I/O
+# ────────────────────────────────────────────────────────────
+
+def read_records(path: str) -> List[Dict[str, Any]]:
+    if Path(path).suffix == ".parquet":
+        import pandas as pd
+        return pd.read_parquet(path).to_dict("records")
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def write_records(records: List[Dict[str, Any]], path: str) -> None:
+    if Path(path).suffix == ".parquet":
+        import pandas as pd
+        pd.DataFrame(records).to_parquet(path, index=False)
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        for rec in records:
+            f.write(json.dumps(rec, ensure_ascii=False, default=str) + "\n")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tag articles with every ticker they mention")
+    parser.add_argument("--input", default="selenium_yahoo_finance.jsonl", help="JSONL or Parquet input")
+    parser.add_argument("--output", default="articles_tagged.jsonl", help="JSONL or Parquet output")
+    parser.add_argument("--symbols", default=SYMBOLS_FILE, help="symbol,name,aliases,ambiguous CSV dictionary")
+    args = parser.parse_args()
+
+    tagger  = SymbolTagger.from_csv(args.symbols)
+    records = tag_records(read_records(args.input), tagger)
+    write_records(records, args.output)
+
+    tagged = sum(1 for r in records if r["tickers"])
+    print(f"Tagged {tagged} of {len(records)} articles with "
+          f"{sum(len(r['tickers']) for r in records)} ticker mentions "
+          f"({len(tagger.symbols)} symbols in dictionary)")
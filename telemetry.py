@@ -0,0 +1,210 @@
+"""
+telemetry.py
+
+Shared timing spans, counters and peak-RSS sampling for the scraper,
+dataPrep, summarizer, ingest and rag.
+
+Disabled unless MARKETDIGEST_TELEMETRY names an output directory (or
+enable() is called). When disabled, span() returns a shared no-op and
+count() returns immediately, so instrumented code pays one attribute
+check per call.
+
+When enabled, each process writes on exit (or flush()):
+  <dir>/<process>-<pid>.trace.json   Chrome trace events (open in chrome://tracing or Perfetto)
+  <dir>/<process>.prom               Prometheus text format, for node_exporter's textfile collector
+
+rag_service.py also serves the same Prometheus text on GET /metrics.
+
+Usage:
+  import telemetry
+  with telemetry.span("summarize.chunk", chars=len(chunk)):
+      ...
+  telemetry.count("tokens_generated", n)
+"""
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import resource          # POSIX only
+except ImportError:
+    resource = None
+
+# ────────────────────────────────────────────────────────────
+# CONFIGURATION
+# ────────────────────────────────────────────────────────────
+
+ENV_VAR          = "MARKETDIGEST_TELEMETRY"
+METRIC_PREFIX    = "marketdigest"
+MAX_TRACE_EVENTS = 200_000     # long-running processes keep aggregates but stop tracing past this
+
+enabled = False
+
+_lock        = threading.Lock()
+_out_dir: Optional[Path] = None
+_process     = ""
+_started     = 0.0           # perf_counter at enable(); trace timestamps are relative to it
+_started_wall = 0.0
+_atexit_registered = False
+_events: List[Dict[str, Any]] = []
+_dropped     = 0
+_counters: Dict[str, float] = {}
+_spans: Dict[str, List[float]] = {}    # name -> [count, total seconds, max seconds]
+_peak_rss    = 0
+
+# ────────────────────────────────────────────────────────────
+# RESOURCE SAMPLING
+# ────────────────────────────────────────────────────────────
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process so far (0 if unavailable)."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024    # Linux reports KiB
+    try:
+        import psutil         # Windows: peak_wset is the peak working set
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss)
+    except ImportError:
+        return 0
+
+# ────────────────────────────────────────────────────────────
+# SPANS + COUNTERS
+# ────────────────────────────────────────────────────────────
+
+class _NoopSpan:
+    __slots__ = ()
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        return False
+
+_NOOP = _NoopSpan()
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name: str, args: Dict[str, Any]):
+        self.name  = name
+        self.args  = args
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        _record_span(self.name, self.start, end, self.args)
+        return False
+
+def span(name: str, **args: Any):
+    """Time a block: `with span("rag.generate", batch=4): ...`."""
+    if not enabled:
+        return _NOOP
+    return _Span(name, args)
+
+def count(name: str, n: float = 1) -> None:
+    """Add n to a monotonically increasing counter."""
+    if not enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+def _record_span(name: str, start: float, end: float, args: Dict[str, Any]) -> None:
+    global _dropped, _peak_rss
+    seconds = end - start
+    rss     = peak_rss_bytes()
+    with _lock:
+        agg = _spans.setdefault(name, [0, 0.0, 0.0])
+        agg[0] += 1
+        agg[1] += seconds
+        agg[2]  = max(agg[2], seconds)
+        _peak_rss = max(_peak_rss, rss)
+        if len(_events) >= MAX_TRACE_EVENTS:
+            _dropped += 1
+            return
+        pid, tid = os.getpid(), threading.get_ident()
+        _events.append({"name": name, "ph": "X", "pid": pid, "tid": tid,
+                        "ts": (start - _started) * 1e6, "dur": seconds * 1e6,
+                        "args": args})
+        _events.append({"name": "peak_rss_mb", "ph": "C", "pid": pid, "tid": tid,
+                        "ts": (end - _started) * 1e6, "args": {"mb": rss / 2**20}})
+
+# ────────────────────────────────────────────────────────────
+# EXPORT
+# ────────────────────────────────────────────────────────────
+
+def _metric_name(name: str) -> str:
+    return METRIC_PREFIX + "_" + "".join(c if c.isalnum() else "_" for c in name)
+
+def render_prometheus() -> str:
+    """Counters, per-span totals and peak RSS in Prometheus text format."""
+    with _lock:
+        counters = dict(_counters)
+        spans    = {k: list(v) for k, v in _spans.items()}
+        peak     = max(_peak_rss, peak_rss_bytes())
+    lines = []
+    for name, value in sorted(counters.items()):
+        metric = _metric_name(name) + "_total"
+        lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+    if spans:
+        base = _metric_name("span_seconds")
+        lines.append(f"# TYPE {base} summary")
+        for name, (n, total, _) in sorted(spans.items()):
+            lines.append(f'{base}_count{{span="{name}"}} {n}')
+            lines.append(f'{base}_sum{{span="{name}"}} {total:.6f}')
+        lines.append(f"# TYPE {base}_max gauge")
+        for name, (_, _, longest) in sorted(spans.items()):
+            lines.append(f'{base}_max{{span="{name}"}} {longest:.6f}')
+    metric = _metric_name("peak_rss_bytes")
+    lines += [f"# TYPE {metric} gauge", f"{metric} {peak}"]
+    return "\n".join(lines) + "\n"
+
+def _write_atomic(path: Path, text: str) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+def flush() -> None:
+    """Write the trace and Prometheus files (also runs at exit)."""
+    if not enabled or _out_dir is None:
+        return
+    with _lock:
+        events  = list(_events)
+        dropped = _dropped
+    trace = {
+        "traceEvents": events,
+        "displayTimeUnit": "ms",
+        "otherData": {"process": _process, "started": _started_wall, "dropped_events": dropped},
+    }
+    _out_dir.mkdir(parents=True, exist_ok=True)
+    _write_atomic(_out_dir / f"{_process}-{os.getpid()}.trace.json", json.dumps(trace))
+    _write_atomic(_out_dir / f"{_process}.prom", render_prometheus())
+
+def enable(out_dir: Optional[str] = None, process: Optional[str] = None) -> None:
+    """
+    Turn instrumentation on. With `out_dir`, trace and .prom files are
+    written there at exit; without it, data is only kept in memory
+    (e.g. for a /metrics endpoint).
+    """
+    global enabled, _out_dir, _process, _started, _started_wall, _atexit_registered
+    _out_dir      = Path(out_dir) if out_dir else None
+    _process      = process or Path(sys.argv[0] or "python").stem or "python"
+    _started      = time.perf_counter()
+    _started_wall = time.time()
+    enabled       = True
+    if _out_dir is not None and not _atexit_registered:
+        atexit.register(flush)
+        _atexit_registered = True
+
+if os.environ.get(ENV_VAR):
+    enable(os.environ[ENV_VAR])
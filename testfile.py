@@ -14,6 +14,7 @@ from pathlib import Path
 import numpy as np
 from faiss import IndexFlatL2
 
+from dedup import deduplicate, format_report
 from embeddings import LocalEmbeddings     
 from summarizer import summarize          
 
@@ -34,9 +35,11 @@ TOP_K         = 5
 cutoff_dt = datetime.now(timezone.utc) - timedelta(hours=CUTOFF_HOURS)
 
 raw = Path(JSONL_FILE).read_text(encoding="utf-8").splitlines()
+records, dedup_report = deduplicate([json.loads(line) for line in raw if line.strip()])
+print(format_report(dedup_report), file=sys.stderr)
+
 docs = []
-for line in raw:
-    obj = json.loads(line)
+for obj in records:
     ts  = obj.get("timestamp")
     if ts:
         dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
@@ -100,7 +103,8 @@ def query_loop():
             doc = meta[doc_i]
             print(f"\n{rank}. {doc['title']}")
             print(f"   URL: {doc['url']}")
-            summary = summarize(doc["content"])
+            # interactive: rank sentences with the MiniLM model already loaded instead of running BART
+            summary = summarize(doc["content"], mode="extractive", embed=emb.embed_documents)
             print(f"   Summary: {summary[:300].strip()}…")
 
 